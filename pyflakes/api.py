@@ -3,21 +3,48 @@ API for the command-line I{pyflakes} tool.
 """
 from __future__ import with_statement
 
+import fnmatch
+import functools
 import sys
 import os
 import re
+import threading
 import _ast
 
 from pyflakes import checker, __version__
 from pyflakes import reporter as modReporter
+from pyflakes.cache import ResultCache
+from pyflakes.messages import MessageRecords
+from pyflakes.profiler import Profiler
 
-__all__ = ['check', 'checkPath', 'checkRecursive', 'iterSourceCode', 'main']
+__all__ = ['check', 'checkMany', 'checkPath', 'checkRecursive',
+           'iterSourceCode', 'main']
 
 
 PYTHON_SHEBANG_REGEX = re.compile(br'^#!.*\bpython[23w]?\b\s*$')
 
+try:
+    import queue
+except ImportError:     # Python 2
+    import Queue as queue
 
-def check(codeString, filename, reporter=None):
+# Number of paths handed to a worker process at a time by checkRecursive
+_JOBS_CHUNKSIZE = 8
+
+# Number of files the reader threads of checkRecursive read ahead of the
+# checker, at most
+_READ_AHEAD = 64
+
+# Directories which iterSourceCode does not descend into, unless asked to:
+# version control, caches and dependencies.  Their names are not used by
+# Python packages.
+PRUNED_DIRECTORIES = frozenset([
+    '.git', '.hg', '.svn', '.bzr', '_darcs', '__pycache__', '.tox', '.nox',
+    '.eggs', '.mypy_cache', '.pytest_cache', 'node_modules',
+])
+
+
+def check(codeString, filename, reporter=None, profiler=None):
     """
     Check the Python source given by C{codeString} for flakes.
 
@@ -31,6 +58,8 @@ def check(codeString, filename, reporter=None):
     @param reporter: A L{Reporter} instance, where errors and warnings will be
         reported.
 
+    @param profiler: A L{pyflakes.profiler.Profiler} timing the check.
+
     @return: The number of warnings emitted.
     @rtype: C{int}
     """
@@ -70,35 +99,122 @@ def check(codeString, filename, reporter=None):
         reporter.unexpectedError(filename, 'problem decoding source')
         return 1
     # Okay, it's syntactically valid.  Now check it.
-    w = checker.Checker(tree, filename)
-    w.messages.sort(key=lambda m: m.lineno)
-    for warning in w.messages:
+    result = checker.Checker(tree, filename, profiler=profiler).release()
+    result.messages.sort(key=lambda m: m.lineno)
+    for warning in result.messages:
         reporter.flake(warning)
-    return len(w.messages)
+    return len(result.messages)
+
+
+def checkMany(sources, reporter=None, workers=None):
+    """
+    Check many Python sources, using a pool of C{workers} threads.
+
+    Each source is checked by its own L{checker.Checker}, and checkers can
+    run at the same time in several threads.  With the GIL of CPython, this
+    is not faster than checking the sources one after the other; it serves
+    applications which already run in threads, and Python builds without
+    the GIL.
+
+    @param sources: An iterable of C{(codeString, filename)} pairs, as taken
+        by L{check}.
+    @param reporter: A L{Reporter} instance, where errors and warnings will be
+        reported.  It is only called from the calling thread, in the order of
+        C{sources}.
+    @param workers: The number of threads.  C{None} uses one per CPU, C{1}
+        checks the sources in the calling thread.
+    @return: The number of warnings found.
+    """
+    if reporter is None:
+        reporter = modReporter._makeDefaultReporter()
+    warnings = 0
+    if workers == 1:
+        for codeString, filename in sources:
+            warnings += check(codeString, filename, reporter)
+        return warnings
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(workers)
+    try:
+        for count, calls in pool.imap(_checkRecorded, sources):
+            _replay(calls, reporter)
+            warnings += count
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return warnings
 
 
-def checkPath(filename, reporter=None):
+def _checkRecorded(source):
+    """
+    Check the C{(codeString, filename)} pair C{source} in a thread of
+    L{checkMany}.
+
+    @return: The number of warnings and the calls made to the reporter.
+    """
+    recorder = _RecordingReporter()
+    warnings = check(source[0], source[1], recorder)
+    return warnings, recorder.calls
+
+
+def checkPath(filename, reporter=None, cache=None, profiler=None):
     """
     Check the given path, printing out any warnings detected.
 
     @param reporter: A L{Reporter} instance, where errors and warnings will be
         reported.
+    @param cache: A L{pyflakes.cache.ResultCache} used to skip checking
+        files which were already checked with the same content.
+    @param profiler: A L{pyflakes.profiler.Profiler} timing the checks.
 
     @return: the number of warnings printed
     """
     if reporter is None:
         reporter = modReporter._makeDefaultReporter()
+    codestr, error = _readSource(filename)
+    return _checkRead(filename, codestr, error, reporter, cache, profiler)
+
+
+def _readSource(filename):
+    """
+    Read the source file C{filename}.
+
+    @return: The C{bytes} read and C{None}, or C{None} and the message of the
+        error which prevented reading them.
+    """
     try:
         with open(filename, 'rb') as f:
-            codestr = f.read()
+            return f.read(), None
     except UnicodeError:
-        reporter.unexpectedError(filename, 'problem decoding source')
-        return 1
+        return None, 'problem decoding source'
     except IOError:
         msg = sys.exc_info()[1]
-        reporter.unexpectedError(filename, msg.args[1])
+        return None, msg.args[1]
+
+
+def _checkRead(filename, codestr, error, reporter, cache=None,
+               profiler=None):
+    """
+    Check the source C{codestr} read from C{filename} by L{_readSource}, like
+    L{checkPath}.
+    """
+    if error is not None:
+        reporter.unexpectedError(filename, error)
         return 1
-    return check(codestr, filename, reporter)
+    if cache is None:
+        return check(codestr, filename, reporter, profiler)
+    key = cache.key(codestr, filename)
+    result = cache.get(key, filename)
+    if result is None:
+        recorder = _RecordingReporter()
+        warnings = check(codestr, filename, recorder, profiler)
+        cache.set(key, warnings, recorder.calls)
+        result = warnings, recorder.calls
+    warnings, calls = result
+    _replay(calls, reporter)
+    return warnings
 
 
 def isPythonFile(filename):
@@ -124,38 +240,277 @@ def isPythonFile(filename):
     return PYTHON_SHEBANG_REGEX.match(first_line)
 
 
-def iterSourceCode(paths):
+def _excluded(name, path, exclude):
+    for pattern in exclude:
+        if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern):
+            return True
+    return False
+
+
+def iterSourceCode(paths, exclude=(), sniffShebang=True, gitignore=False,
+                   prune=True):
     """
     Iterate over all Python source files in C{paths}.
 
     @param paths: A list of paths.  Directories will be recursed into and
         any .py files found will be yielded.  Any non-directories will be
         yielded as-is.
+    @param exclude: Glob patterns; the files and directories found whose name
+        or path matches one of them are skipped.
+    @param sniffShebang: Whether the files found which do not end with .py
+        are read to look for a Python shebang.
+    @param gitignore: Whether to skip the files and directories found which
+        git ignores.
+    @param prune: Whether to skip the directories found in
+        L{PRUNED_DIRECTORIES}, and the virtualenvs, found by their
+        C{pyvenv.cfg}.
     """
     for path in paths:
         if os.path.isdir(path):
+            ignored = ()
+            if gitignore:
+                from pyflakes.diff import ignoredPaths
+                ignored = ignoredPaths(path)
             for dirpath, dirnames, filenames in os.walk(path):
+                if prune and dirpath != path and 'pyvenv.cfg' in filenames:
+                    del dirnames[:]
+                    continue
+                if exclude or ignored:
+                    dirnames[:] = [
+                        name for name in dirnames
+                        if not _excluded(name, os.path.join(dirpath, name),
+                                         exclude) and
+                        os.path.join(dirpath, name) not in ignored]
+                if prune:
+                    dirnames[:] = [name for name in dirnames
+                                   if name not in PRUNED_DIRECTORIES]
                 for filename in filenames:
                     full_path = os.path.join(dirpath, filename)
-                    if isPythonFile(full_path):
+                    if exclude and _excluded(filename, full_path, exclude):
+                        continue
+                    if full_path in ignored:
+                        continue
+                    if sniffShebang:
+                        if isPythonFile(full_path):
+                            yield full_path
+                    elif filename.endswith('.py'):
                         yield full_path
         else:
             yield path
 
 
-def checkRecursive(paths, reporter):
+def checkRecursive(paths, reporter, jobs=None, cache=None, profiler=None,
+                   stopOnWarning=False, exclude=(), sniffShebang=True,
+                   gitignore=False, readers=None, prune=True):
     """
     Recursively check all source files in C{paths}.
 
     @param paths: A list of paths to Python source files and directories
         containing Python source files.
     @param reporter: A L{Reporter} where all of the warnings and errors
-        will be reported to.
+        will be reported to.  If it has a C{fileChecked} method, it is called
+        once the results of each file are reported.
+    @param jobs: The number of worker processes used to check the files.
+        C{0} uses one process per CPU, C{None} or C{1} checks the files
+        in the current process.  The reporter receives the results in the
+        same order either way.
+    @param cache: A L{pyflakes.cache.ResultCache} used to skip checking
+        files which were already checked with the same content.
+    @param profiler: A L{pyflakes.profiler.Profiler} timing the checks,
+        including those made by worker processes.
+    @param stopOnWarning: Whether to stop after the first file with warnings
+        or errors, when only their presence matters.
+    @param exclude: Glob patterns of files and directories to skip, see
+        L{iterSourceCode}.
+    @param sniffShebang: Whether files not ending with .py are read to look
+        for a Python shebang.
+    @param gitignore: Whether to skip the files ignored by git.
+    @param prune: Whether to skip the version control, cache and dependency
+        directories, see L{iterSourceCode}.
+    @param readers: The number of threads finding and reading the files ahead
+        of the checks made in the current process, hiding the latency of the
+        file system.  C{None} or C{0} reads each file just before checking it.
     @return: The number of warnings found.
     """
+    sources = iterSourceCode(paths, exclude, sniffShebang, gitignore, prune)
+    if jobs is not None and jobs != 1:
+        warnings = _checkParallel(sources, reporter, jobs, cache, profiler,
+                                  stopOnWarning)
+        if warnings is not None:
+            return warnings
+    if readers:
+        contents = _prefetch(sources, readers)
+    else:
+        contents = ((sourcePath,) + _readSource(sourcePath)
+                    for sourcePath in sources)
+    fileChecked = getattr(reporter, 'fileChecked', None)
     warnings = 0
-    for sourcePath in iterSourceCode(paths):
-        warnings += checkPath(sourcePath, reporter)
+    try:
+        for sourcePath, codestr, error in contents:
+            warnings += _checkRead(sourcePath, codestr, error, reporter, cache,
+                                   profiler)
+            if fileChecked is not None:
+                fileChecked()
+            if warnings and stopOnWarning:
+                break
+    finally:
+        contents.close()
+    return warnings
+
+
+def _prefetch(sources, readers, readAhead=_READ_AHEAD):
+    """
+    Read the source files C{sources} using C{readers} threads, while they are
+    consumed.
+
+    A thread iterates over C{sources}, so finding the files is done ahead
+    too, and hands each one to the readers in a slot which it also queues in
+    order.  This queue is bounded by C{readAhead}, which limits the memory
+    held by the files read and not consumed yet.
+
+    @return: A generator of the C{(filename, codestr, error)} of each file, in
+        the order of C{sources}, as returned by L{_readSource}.  Closing it
+        stops the threads.
+    """
+    pending = queue.Queue()
+    ordered = queue.Queue(readAhead)
+    stopped = threading.Event()
+
+    def find():
+        try:
+            for filename in sources:
+                if stopped.is_set():
+                    break
+                slot = [filename, None, threading.Event()]
+                pending.put(slot)
+                ordered.put(slot)
+        except Exception:
+            ordered.put(sys.exc_info()[1])
+        finally:
+            ordered.put(None)
+            for i in range(readers):
+                pending.put(None)
+
+    def read():
+        for slot in iter(pending.get, None):
+            if not stopped.is_set():
+                slot[1] = _readSource(slot[0])
+            slot[2].set()
+
+    threads = [threading.Thread(target=find)]
+    threads.extend(threading.Thread(target=read) for i in range(readers))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for slot in iter(ordered.get, None):
+            if isinstance(slot, Exception):
+                raise slot
+            slot[2].wait()
+            yield (slot[0],) + slot[1]
+    finally:
+        stopped.set()
+        # Unblock the thread finding the files, if the queue is full.
+        while threads[0].is_alive():
+            try:
+                ordered.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+class _RecordingReporter(object):
+    """
+    Record the calls made to a reporter, so that they can be sent to another
+    process and replayed there.
+
+    Consecutive warnings about a file are recorded as one C{'flakes'} call
+    holding their L{MessageRecords}.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def unexpectedError(self, filename, msg):
+        self.calls.append(('unexpectedError', (filename, msg)))
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        self.calls.append(
+            ('syntaxError', (filename, msg, lineno, offset, text)))
+
+    def flake(self, message):
+        if (not self.calls or self.calls[-1][0] != 'flakes' or
+                self.calls[-1][1].filename != message.filename):
+            self.calls.append(('flakes', MessageRecords(message.filename)))
+        self.calls[-1][1].append(message)
+
+
+def _replay(calls, reporter):
+    """
+    Replay calls recorded by a L{_RecordingReporter} on C{reporter}.
+    """
+    for name, args in calls:
+        if name == 'flakes':
+            for message in args:
+                reporter.flake(message)
+        else:
+            getattr(reporter, name)(*args)
+
+
+def _checkPathRecorded(filename, cache=None, profile=False):
+    """
+    Check C{filename} in a worker process.
+
+    @param profile: Whether to time the check.
+    @return: C{(warnings, calls, profile)}, the number of warnings, the
+        reporter calls to replay in the parent process and the measures of
+        the profiler, if any.
+    """
+    recorder = _RecordingReporter()
+    profiler = Profiler() if profile else None
+    warnings = checkPath(filename, recorder, cache, profiler)
+    return warnings, recorder.calls, profiler and profiler.asDict()
+
+
+def _checkParallel(sources, reporter, jobs, cache=None, profiler=None,
+                   stopOnWarning=False):
+    """
+    Check the source files C{sources} using a pool of C{jobs} processes.
+
+    @param stopOnWarning: Whether to stop the pool after the first file with
+        warnings, in the order of C{sources}.
+    @return: The number of warnings found, or C{None} if no process pool
+        can be created on this platform.
+    """
+    try:
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs or None)
+    except (ImportError, NotImplementedError, OSError):
+        return None
+
+    fileChecked = getattr(reporter, 'fileChecked', None)
+    warnings = 0
+    try:
+        # imap hands back the results in the order of sources
+        worker = functools.partial(_checkPathRecorded, cache=cache,
+                                   profile=profiler is not None)
+        results = pool.imap(worker, sources, _JOBS_CHUNKSIZE)
+        for count, calls, profile in results:
+            _replay(calls, reporter)
+            if fileChecked is not None:
+                fileChecked()
+            if profile:
+                profiler.merge(profile)
+            warnings += count
+            if warnings and stopOnWarning:
+                pool.terminate()
+                break
+        else:
+            pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
     return warnings
 
 
@@ -195,10 +550,132 @@ def main(prog=None, args=None):
     _exitOnSignal('SIGPIPE', 1)
 
     parser = optparse.OptionParser(prog=prog, version=__version__)
-    (__, args) = parser.parse_args(args=args)
-    reporter = modReporter._makeDefaultReporter()
+    parser.add_option('-j', '--jobs', type='int', default=1,
+                      help='number of processes used to check files '
+                           '(0 uses one per CPU) [default: %default]')
+    parser.add_option('--readers', type='int', default=0,
+                      help='number of threads reading files ahead of the '
+                           'checks, with one process (0 reads each file when '
+                           'checking it) [default: %default]')
+    parser.add_option('--cache-dir', metavar='DIR',
+                      default=os.environ.get('PYFLAKES_CACHE_DIR'),
+                      help='remember the results for unchanged files in DIR '
+                           '[default: $PYFLAKES_CACHE_DIR]')
+    parser.add_option('--no-cache', dest='use_cache', action='store_false',
+                      default=True, help='do not use the result cache')
+    parser.add_option('--daemon', action='store_true', default=False,
+                      help='serve check requests from pyflakes-client on a '
+                           'Unix domain socket')
+    parser.add_option('--socket', metavar='PATH',
+                      help='the socket used by --daemon '
+                           '[default: $PYFLAKES_SOCKET or a per-user path]')
+    parser.add_option('--watch', action='store_true', default=False,
+                      help='check the files again each time they change')
+    parser.add_option('--diff', metavar='REF',
+                      help='check only the Python files of the git '
+                           'repository changed since the revision REF, and '
+                           'the untracked ones')
+    parser.add_option('--diff-lines', action='store_true', default=False,
+                      help='with --diff, only report the warnings on the '
+                           'changed lines')
+    parser.add_option('--exclude', metavar='PATTERNS', default='',
+                      help='comma-separated glob patterns of the files and '
+                           'directories to skip')
+    parser.add_option('--gitignore', action='store_true', default=False,
+                      help='skip the files and directories ignored by git')
+    parser.add_option('--no-shebang', dest='sniff_shebang',
+                      action='store_false', default=True,
+                      help='only check the files ending with .py, instead of '
+                           'also reading the others for a Python shebang')
+    parser.add_option('--no-prune', dest='prune', action='store_false',
+                      default=True,
+                      help='also check the files in version control, cache '
+                           'and dependency directories, like .git and '
+                           'node_modules, and in virtualenvs')
+    parser.add_option('-q', '--quiet', action='store_true', default=False,
+                      help='report nothing, and stop at the first file with '
+                           'warnings or errors; only the exit status tells '
+                           'whether there were any')
+    parser.add_option('--format', choices=('default', 'jsonl'),
+                      default='default',
+                      help='the output format, "default" or "jsonl" for '
+                           'one JSON object per line [default: %default]')
+    parser.add_option('--profile', action='store_true', default=False,
+                      help='write the time spent per node type and phase '
+                           'to stderr')
+    parser.add_option('--profile-json', action='store_true', default=False,
+                      help='like --profile, but write JSON')
+    (options, args) = parser.parse_args(args=args)
+    if options.jobs < 0:
+        parser.error('--jobs must not be negative')
+    if options.readers < 0:
+        parser.error('--readers must not be negative')
+    if options.diff_lines and not options.diff:
+        parser.error('--diff-lines requires --diff')
+    cache = None
+    if options.use_cache and options.cache_dir:
+        cache = ResultCache(options.cache_dir)
+    # The keyword arguments of iterSourceCode
+    walkOptions = {
+        'exclude': [pattern for pattern in options.exclude.split(',')
+                    if pattern],
+        'sniffShebang': options.sniff_shebang,
+        'gitignore': options.gitignore,
+        'prune': options.prune,
+    }
+    if options.daemon:
+        from pyflakes import daemon
+        if args:
+            parser.error('--daemon does not take paths')
+        try:
+            daemon.serve(options.socket, cache, walkOptions)
+        except EnvironmentError as e:
+            parser.error('--daemon: %s' % (e,))
+        return
+    if options.quiet:
+        reporter = modReporter.NullReporter()
+    elif options.format == 'jsonl':
+        reporter = modReporter.JSONLinesReporter(sys.stdout)
+    else:
+        reporter = modReporter._makeDefaultReporter()
+    if options.watch:
+        from pyflakes.watch import Watcher
+        if not args:
+            parser.error('--watch requires paths')
+        Watcher(args, reporter, walkOptions=walkOptions).run()
+    profiler = None
+    if options.profile or options.profile_json:
+        profiler = Profiler()
+    checkReporter = reporter
+    if options.diff:
+        from pyflakes import diff
+        try:
+            lines = diff.changedLines(options.diff)
+        except diff.DiffError as e:
+            parser.error('--diff: %s' % (e,))
+        if options.diff_lines:
+            checkReporter = diff.LineFilteringReporter(reporter, lines)
+        args = diff.changedSourceFiles(lines, args)
     if args:
-        warnings = checkRecursive(args, reporter)
+        warnings = checkRecursive(args, checkReporter, jobs=options.jobs,
+                                  cache=cache, profiler=profiler,
+                                  stopOnWarning=options.quiet and
+                                  not options.diff_lines,
+                                  readers=options.readers, **walkOptions)
+        if cache is not None:
+            cache.prune()
+    elif options.diff:
+        warnings = 0
     else:
-        warnings = check(sys.stdin.read(), '<stdin>', reporter)
+        warnings = check(sys.stdin.read(), '<stdin>', reporter, profiler)
+    if checkReporter is not reporter:
+        warnings = checkReporter.warnings
+    if hasattr(reporter, 'flush'):
+        reporter.flush()
+    if options.profile_json:
+        import json
+        json.dump(profiler.asDict(), sys.stderr, indent=2, sort_keys=True)
+        sys.stderr.write('\n')
+    elif options.profile:
+        sys.stderr.write(profiler.formatTable())
     raise SystemExit(warnings > 0)
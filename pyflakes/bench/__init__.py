@@ -0,0 +1,265 @@
+"""
+Benchmarks of the checker on generated source code.
+
+Each scenario generates a module stressing one part of the checker.  Run them
+with C{python -m pyflakes.bench}.
+"""
+from __future__ import division
+
+import ast
+import gc
+import sys
+import time
+
+from pyflakes import checker, __version__
+
+try:
+    import tracemalloc
+except ImportError:     # Python 2.7
+    tracemalloc = None
+
+__all__ = ['Scenario', 'SCENARIOS', 'runScenario', 'runAll', 'runRetention']
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class Scenario(object):
+    """
+    A benchmark scenario.
+
+    @ivar name: The name of the scenario.
+    @ivar generate: A callable taking the scale of the benchmark and returning
+        the source of the module to check.
+    @ivar withDoctest: Whether doctests are checked.
+    """
+
+    def __init__(self, name, generate, withDoctest=False):
+        self.name = name
+        self.generate = generate
+        self.withDoctest = withDoctest
+
+    @property
+    def description(self):
+        return self.generate.__doc__.strip()
+
+
+def _nestedBranches(depth, indent):
+    if depth == 0:
+        return [indent + 'x = a']
+    inner = indent + '    '
+    return ([indent + 'if a:', inner + 'x = a'] +
+            _nestedBranches(depth - 1, inner) +
+            [indent + 'else:', inner + 'x = a'])
+
+
+def deepNesting(scale):
+    """
+    Functions rebinding a name in the branches of deeply nested if statements.
+    """
+    lines = []
+    for i in range(scale):
+        lines.append('def f%d(a):' % i)
+        lines.extend(_nestedBranches(40, '    '))
+        lines.append('    return x')
+    return '\n'.join(lines) + '\n'
+
+
+def manyGlobals(scale):
+    """
+    Functions declaring globals, in a module with many undefined names.
+    """
+    lines = ['u%d' % i for i in range(scale * 10)]
+    for i in range(scale):
+        names = ', '.join('g%d_%d' % (i, j) for j in range(10))
+        lines.append('def f%d():' % i)
+        lines.append('    global %s' % names)
+        lines.append('    g%d_0 = u%d' % (i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def hugeDict(scale):
+    """
+    A dict literal with many keys, some of them repeated.
+    """
+    items = []
+    for i in range(scale * 100):
+        items.append("    'k%d': %d," % (i % (scale * 90), i))
+        items.append("    v%d: v%d," % (i % (scale * 90), i))
+    return 'd = {\n%s\n}\n' % '\n'.join(items)
+
+
+def manyDoctests(scale):
+    """
+    Functions with docstrings made of doctests.
+    """
+    lines = []
+    for i in range(scale * 10):
+        lines.extend([
+            'def f%d(a):' % i,
+            '    """',
+            '    >>> import os',
+            '    >>> x = f%d(1)' % i,
+            '    >>> x + y',
+            '    >>> [z for z in range(x)]',
+            '    >>> def g(b):',
+            '    ...     return b + a',
+            '    """',
+            '    return a',
+        ])
+    return '\n'.join(lines) + '\n'
+
+
+def manyStarImports(scale):
+    """
+    Star imports, and names which may come from them.
+    """
+    lines = ['from m%d import *' % i for i in range(50)]
+    for i in range(scale * 10):
+        lines.append('def f%d():' % i)
+        lines.extend('    n%d_%d' % (i, j) for j in range(10))
+    return '\n'.join(lines) + '\n'
+
+
+def manyBindings(scale):
+    """
+    Many imports, arguments and local variables, most of them unused.
+    """
+    lines = []
+    for i in range(scale * 10):
+        lines.append('import m%d' % i)
+        lines.append('from m%d import a%d, b%d as c%d' % (i, i, i, i))
+        lines.append('def f%d(%s):' % (
+            i, ', '.join('p%d' % j for j in range(10))))
+        lines.extend('    v%d = p%d' % (j, j) for j in range(10))
+        lines.append('    return v0')
+    return '\n'.join(lines) + '\n'
+
+
+SCENARIOS = [
+    Scenario('nesting', deepNesting),
+    Scenario('globals', manyGlobals),
+    Scenario('dict', hugeDict),
+    Scenario('doctests', manyDoctests, withDoctest=True),
+    Scenario('star-imports', manyStarImports),
+    Scenario('bindings', manyBindings),
+]
+
+
+def _check(tree, scenario):
+    return checker.Checker(tree, '<%s>' % scenario.name,
+                           withDoctest=scenario.withDoctest)
+
+
+def runScenario(scenario, scale=10, repeat=3):
+    """
+    Run C{scenario}.
+
+    @param scale: The size of the generated module; each scenario grows
+        roughly linearly with it.
+    @param repeat: The number of timed checks; the fastest one is reported.
+    @return: A C{dict} of the results.
+    """
+    source = scenario.generate(scale)
+    nodes = sum(1 for _ in ast.walk(ast.parse(source)))
+    times = []
+    for _ in range(repeat):
+        tree = ast.parse(source)
+        gc.collect()
+        start = _timer()
+        w = _check(tree, scenario)
+        times.append(_timer() - start)
+    seconds = min(times)
+
+    peak = None
+    if tracemalloc is not None:
+        tree = ast.parse(source)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            _check(tree, scenario)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'scenario': scenario.name,
+        'scale': scale,
+        'lines': source.count('\n'),
+        'nodes': nodes,
+        'messages': len(w.messages),
+        'seconds': seconds,
+        'nodes_per_second': nodes / seconds if seconds else None,
+        'peak_memory': peak,
+    }
+
+
+def smallModule(index):
+    """
+    A small module, different for each C{index}.
+    """
+    return ('import os, m%d\n'
+            'def f%d(a, b):\n'
+            '    c = [x + a for x in b if x]\n'
+            '    return os.path.join(c, a, u%d)\n'
+            'class C%d(object):\n'
+            '    def g(self, d):\n'
+            '        return self.h(d)\n' % (index, index, index, index))
+
+
+def runRetention(files=10000, release=True, samples=10):
+    """
+    Check C{files} small modules one after the other, with the garbage
+    collector disabled, as a process embedding pyflakes for a long time would
+    between collections, and measure the memory allocated meanwhile.
+
+    @param release: Whether the checkers are released after each check, see
+        L{checker.Checker.release}.
+    @param samples: The number of times the memory is measured.
+    @return: A C{dict} of the results, whose C{memory} lists the memory
+        allocated, in bytes, once each part of the files is checked; it is
+        C{None} without C{tracemalloc}.
+    """
+    memory = None
+    if tracemalloc is not None:
+        memory = []
+        tracemalloc.start()
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = _timer()
+        for i in range(files):
+            w = checker.Checker(ast.parse(smallModule(i)), 'm%d.py' % i)
+            if release:
+                w.release()
+            del w
+            if memory is not None and (i + 1) % max(files // samples, 1) == 0:
+                memory.append(tracemalloc.get_traced_memory()[0])
+        seconds = _timer() - start
+    finally:
+        if enabled:
+            gc.enable()
+        if tracemalloc is not None:
+            tracemalloc.stop()
+    return {
+        'files': files,
+        'release': release,
+        'seconds': seconds,
+        'memory': memory,
+    }
+
+
+def runAll(names=None, scale=10, repeat=3):
+    """
+    Run the scenarios called C{names}, or all of them.
+
+    @return: A C{dict} with the versions in use and the list of results.
+    """
+    scenarios = [s for s in SCENARIOS if not names or s.name in names]
+    return {
+        'pyflakes': __version__,
+        'python': sys.version.split()[0],
+        'implementation': getattr(sys, 'implementation', None) and
+        sys.implementation.name,
+        'results': [runScenario(s, scale, repeat) for s in scenarios],
+    }
@@ -0,0 +1,75 @@
+"""
+Run the benchmarks: C{python -m pyflakes.bench}.
+"""
+import json
+import optparse
+import sys
+
+from pyflakes import __version__
+from pyflakes.bench import SCENARIOS, runAll, runRetention
+
+
+def formatTable(report):
+    lines = ['%-14s %8s %9s %10s %12s %12s' % (
+        'scenario', 'nodes', 'messages', 'time (s)', 'nodes/s', 'peak (KiB)')]
+    for result in report['results']:
+        peak = result['peak_memory']
+        lines.append('%-14s %8d %9d %10.4f %12.0f %12s' % (
+            result['scenario'], result['nodes'], result['messages'],
+            result['seconds'], result['nodes_per_second'] or 0,
+            '-' if peak is None else '%d' % (peak // 1024)))
+    return '\n'.join(lines) + '\n'
+
+
+def formatRetention(result):
+    lines = ['%d files checked in %.2f s, %s' % (
+        result['files'], result['seconds'],
+        'releasing the checkers' if result['release'] else
+        'not releasing the checkers')]
+    if result['memory'] is not None:
+        lines.append('memory allocated (KiB): %s' % ' '.join(
+            '%d' % (size // 1024) for size in result['memory']))
+    return '\n'.join(lines) + '\n'
+
+
+def main(args=None):
+    parser = optparse.OptionParser(
+        prog='python -m pyflakes.bench', version=__version__,
+        usage='%prog [options] [SCENARIO...]',
+        description='Scenarios: %s.' % ', '.join(s.name for s in SCENARIOS))
+    parser.add_option('-s', '--scale', type='int', default=10,
+                      help='size of the generated modules [default: %default]')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                      help='number of timed runs [default: %default]')
+    parser.add_option('--json', action='store_true', default=False,
+                      help='write the results as JSON')
+    parser.add_option('--retention', metavar='FILES', type='int',
+                      help='instead of the scenarios, check FILES small '
+                           'modules in a row with the garbage collector '
+                           'disabled, and report the memory allocated')
+    parser.add_option('--no-release', dest='release', action='store_false',
+                      default=True,
+                      help='with --retention, do not release the checkers')
+    (options, names) = parser.parse_args(args=args)
+    unknown = set(names).difference(s.name for s in SCENARIOS)
+    if unknown:
+        parser.error('unknown scenario: %s' % ', '.join(sorted(unknown)))
+    if options.scale < 1:
+        parser.error('--scale must be at least 1')
+    if options.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    if options.retention is not None:
+        report = runRetention(options.retention, options.release)
+        format = formatRetention
+    else:
+        report = runAll(names, options.scale, options.repeat)
+        format = formatTable
+    if options.json:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        sys.stdout.write(format(report))
+
+
+if __name__ == '__main__':
+    main()
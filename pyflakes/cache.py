@@ -0,0 +1,163 @@
+"""
+Provide the ResultCache class, an on-disk cache of check results.
+"""
+from __future__ import with_statement
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from pyflakes import checker, __version__
+
+__all__ = ['ResultCache']
+
+# The version of the format of the entries
+_FORMAT = 2
+
+
+class ResultCache(object):
+    """
+    Remember the results of checking Python source across runs.
+
+    Entries are keyed by a hash of the source bytes together with everything
+    else the result depends on: the pyflakes and Python versions, the set of
+    built-in names and whether doctests are checked.  The filename is not part
+    of the key, so identical files share an entry.
+
+    The cache is a directory of pickled reporter calls.  It must only be
+    shared with users who are trusted to write to it.
+
+    @ivar directory: The directory holding the cache entries.
+    @ivar maxSize: The size in bytes above which L{prune} evicts the least
+        recently used entries.
+    """
+
+    # The size of the cache as of the last prune, plus the entries stored
+    # since; None until the first prune.
+    _size = None
+
+    def __init__(self, directory, maxSize=64 * 1024 * 1024,
+                 withDoctest='PYFLAKES_DOCTEST' in os.environ):
+        self.directory = directory
+        self.maxSize = maxSize
+        config = repr((_FORMAT, __version__, sys.version,
+                       sorted(checker.Checker.builtIns), bool(withDoctest)))
+        self._config = config.encode('utf-8')
+
+    def key(self, codestr, filename):
+        """
+        Compute the cache key for checking C{codestr} as C{filename}.
+
+        @param codestr: The Python source, as bytes.
+        """
+        if not isinstance(codestr, bytes):
+            codestr = codestr.encode('utf-8')
+        digest = hashlib.sha1(self._config)
+        # __init__.py modules may use __path__ and have no UndefinedExport
+        if os.path.basename(filename) == '__init__.py':
+            digest.update(b'\0package')
+        digest.update(b'\0')
+        digest.update(codestr)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key, filename):
+        """
+        Look up the result stored for C{key}.
+
+        @param filename: The name to report the stored problems against.
+        @return: C{(warnings, calls)}, as stored by L{set}, or C{None} if
+            there is no usable entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                warnings, calls = pickle.load(f)
+        except Exception:
+            return None
+        try:
+            # Record the use for the least recently used eviction
+            os.utime(path, None)
+        except OSError:
+            pass
+        return warnings, [_withFilename(call, filename) for call in calls]
+
+    def set(self, key, warnings, calls):
+        """
+        Store the result of a check under C{key}.
+
+        @param warnings: The number of warnings reported.
+        @param calls: The reporter calls, as recorded by
+            L{pyflakes.api._RecordingReporter}.
+        """
+        calls = [_withFilename(call, None) for call in calls]
+        data = pickle.dumps((warnings, calls), pickle.HIGHEST_PROTOCOL)
+        path = self._path(key)
+        try:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                if not os.path.isdir(os.path.dirname(path)):
+                    raise
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                # Windows does not replace existing files; another process
+                # stored the same entry first.
+                os.remove(tmp)
+            if self._size is not None:
+                self._size += len(data)
+        except (IOError, OSError):
+            # A cache which cannot be written to is not an error
+            pass
+
+    def prune(self):
+        """
+        Remove the least recently used entries until the cache is no larger
+        than C{maxSize}.
+
+        Once pruned, the cache is only walked again when the entries stored
+        by this object may have made it too large, so that a long-running
+        process can prune after each check at little cost.
+        """
+        if self._size is not None and self._size <= self.maxSize:
+            return
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total > self.maxSize:
+            entries.sort()
+            for mtime, size, path in entries:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.maxSize:
+                    break
+        self._size = total
+
+
+def _withFilename(call, filename):
+    """
+    Return the reporter call C{call} reporting against C{filename}.
+    """
+    name, args = call
+    if name == 'flakes':
+        return name, args.withFilename(filename)
+    return name, (filename,) + tuple(args[1:])
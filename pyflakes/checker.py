@@ -9,6 +9,8 @@ import ast
 import doctest
 import os
 import sys
+import threading
+from collections import OrderedDict
 
 PY2 = sys.version_info < (3, 0)
 PY34 = sys.version_info < (3, 5)    # Python 2.7 to 3.4
@@ -61,8 +63,47 @@ else:
     LOOP_TYPES = (ast.While, ast.For, ast.AsyncFor)
 
 
+# The kinds of the fields of AST nodes, for _FieldsOrder.
+_NODE, _NODES, _SCALAR = range(3)
+
+# Expression contexts and operators: leaves ignored by the checker, and
+# shared by the nodes of a tree, so they are not handled at all.
+_LEAF_TYPES = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop,
+               ast.cmpop)
+
+
+def _fieldKind(value):
+    """
+    Tell the kind of a field from its value, or return C{None} when the value
+    does not tell it, like C{None} or an empty list.  The fields holding
+    expression contexts and operators are treated as scalars.
+    """
+    if isinstance(value, ast.AST):
+        return _SCALAR if isinstance(value, _LEAF_TYPES) else _NODE
+    if isinstance(value, list):
+        for item in value:
+            if item is not None:
+                if isinstance(item, ast.AST) and \
+                        not isinstance(item, _LEAF_TYPES):
+                    return _NODES
+                return _SCALAR
+        return None
+    if value is None:
+        return None
+    return _SCALAR
+
+
 class _FieldsOrder(dict):
-    """Fix order of AST node fields."""
+    """
+    Fix order of AST node fields, and tell which fields hold child nodes.
+
+    The fields of each class are C{[name, kind]} entries, the kind being
+    C{_NODE} for a node, C{_NODES} for a list of nodes, or C{_SCALAR} for
+    fields which never hold nodes to handle, like C{Name.id} or C{Name.ctx}.
+    The kind is C{None} until a node with a value telling it is seen, as the
+    grammar of the running Python is not available; it is the same for all
+    the nodes of a class.
+    """
 
     def _get_fields(self, node_class):
         # handle iter before target, and generators before element
@@ -76,10 +117,14 @@ class _FieldsOrder(dict):
         return tuple(sorted(fields, key=key_first, reverse=True))
 
     def __missing__(self, node_class):
-        self[node_class] = fields = self._get_fields(node_class)
+        self[node_class] = fields = [
+            [name, None] for name in self._get_fields(node_class)]
         return fields
 
 
+_fields_order = _FieldsOrder()
+
+
 def counter(items):
     """
     Simplest required implementation of collections.Counter. Required as 2.6
@@ -91,10 +136,11 @@ def counter(items):
     return results
 
 
-def iter_child_nodes(node, omit=None, _fields_order=_FieldsOrder()):
+def iter_child_nodes(node, omit=None, _fields_order=_fields_order):
     """
     Yield all direct child nodes of *node*, that is, all fields that
-    are nodes and all items of fields that are lists of nodes.
+    are nodes and all items of fields that are lists of nodes, except
+    expression contexts and operators.
 
     :param node:          AST node to be iterated upon
     :param omit:          String or tuple of strings denoting the
@@ -102,15 +148,28 @@ def iter_child_nodes(node, omit=None, _fields_order=_FieldsOrder()):
                           further parsing
     :param _fields_order: Order of AST node fields
     """
-    for name in _fields_order[node.__class__]:
-        if omit and name in omit:
+    return iter(_child_nodes(node, omit, _fields_order))
+
+
+def _child_nodes(node, omit=None, _fields_order=_fields_order):
+    """
+    Return the list of the direct child nodes of *node*, like
+    L{iter_child_nodes}.  The items of lists of nodes may be C{None}.
+    """
+    children = []
+    for field in _fields_order[node.__class__]:
+        name, kind = field
+        if kind is _SCALAR or omit and name in omit:
             continue
-        field = getattr(node, name, None)
-        if isinstance(field, ast.AST):
-            yield field
-        elif isinstance(field, list):
-            for item in field:
-                yield item
+        value = getattr(node, name, None)
+        if kind is None:
+            kind = field[1] = _fieldKind(value)
+        if kind is _NODE:
+            if value is not None:
+                children.append(value)
+        elif kind is _NODES and value:
+            children.extend(value)
+    return children
 
 
 def convert_to_value(item):
@@ -154,7 +213,11 @@ class Binding(object):
 
     @ivar used: pair of (L{Scope}, node) indicating the scope and
                 the node that this binding was last used.
+
+    Bindings are slotted, since a large module has many of them; subclasses
+    must declare C{__slots__} too.
     """
+    __slots__ = ('name', 'source', 'used')
 
     def __init__(self, name, source):
         self.name = name
@@ -178,6 +241,7 @@ class Definition(Binding):
     """
     A binding that defines a function or a class.
     """
+    __slots__ = ()
 
 
 class UnhandledKeyType(object):
@@ -213,6 +277,7 @@ class Importation(Definition):
         possibly including multiple dotted components.
     @type fullName: C{str}
     """
+    __slots__ = ('fullName', 'redefined')
 
     def __init__(self, name, source, full_name=None):
         self.fullName = full_name or name
@@ -261,6 +326,7 @@ class SubmoduleImportation(Importation):
     RedefinedWhileUnused is suppressed in `redefines` unless the submodule
     name is also the same, to avoid false positives.
     """
+    __slots__ = ()
 
     def __init__(self, name, source):
         # A dot should only appear in the name when it is a submodule import
@@ -283,6 +349,7 @@ class SubmoduleImportation(Importation):
 
 
 class ImportationFrom(Importation):
+    __slots__ = ('module', 'real_name')
 
     def __init__(self, name, source, module, real_name=None):
         self.module = module
@@ -314,6 +381,7 @@ class ImportationFrom(Importation):
 
 class StarImportation(Importation):
     """A binding created by a 'from x import *' statement."""
+    __slots__ = ()
 
     def __init__(self, name, source):
         super(StarImportation, self).__init__('*', source)
@@ -340,6 +408,7 @@ class FutureImportation(ImportationFrom):
 
     `__future__` imports are implicitly used.
     """
+    __slots__ = ()
 
     def __init__(self, name, source, scope):
         super(FutureImportation, self).__init__(name, source, '__future__')
@@ -350,6 +419,7 @@ class Argument(Binding):
     """
     Represents binding a name as an argument.
     """
+    __slots__ = ()
 
 
 class Assignment(Binding):
@@ -360,14 +430,15 @@ class Assignment(Binding):
     the checker does not consider assignments in tuple/list unpacking to be
     Assignments, rather it treats them as simple Bindings.
     """
+    __slots__ = ()
 
 
 class FunctionDefinition(Definition):
-    pass
+    __slots__ = ()
 
 
 class ClassDefinition(Definition):
-    pass
+    __slots__ = ()
 
 
 class ExportBinding(Binding):
@@ -384,6 +455,7 @@ class ExportBinding(Binding):
     Names which are imported and not otherwise used but appear in the value of
     C{__all__} will not have an unused import warning reported for them.
     """
+    __slots__ = ('names',)
 
     def __init__(self, name, source, scope):
         if '__all__' in scope and isinstance(source, ast.AugAssign):
@@ -399,6 +471,8 @@ class ExportBinding(Binding):
 
 class Scope(dict):
     importStarred = False       # set to True when import * is found
+    starImports = ()            # names of the StarImportation bindings
+    builtIns = frozenset()      # names defined in this scope only, as builtins
 
     def __repr__(self):
         scope_cls = self.__class__.__name__
@@ -450,6 +524,7 @@ class ModuleScope(Scope):
 
 class DoctestScope(ModuleScope):
     """Scope for a doctest."""
+    builtIns = frozenset(['_'])
 
 
 # Globally defined names which are not attributes of the builtins module, or
@@ -457,6 +532,63 @@ class DoctestScope(ModuleScope):
 _MAGIC_GLOBALS = ['__file__', '__builtins__', 'WindowsError']
 
 
+# Marks the entries of the stack of Checker.handleNode leaving a node.
+_LEAVE = object()
+
+
+class _DoctestCache(object):
+    """
+    The doctest examples of the docstrings seen last, shared by the checkers
+    of the process, so that checking a module again, as the daemon and the
+    watcher do, does not parse its docstrings again.
+
+    An entry is a tuple of C{(source, lineno, indent, error)} examples,
+    C{error} being the C{(lineno, offset)} of the syntax error of the example
+    or C{None}.  The compiled trees are not kept, since the checker changes
+    their nodes.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, docstring):
+        with self._lock:
+            entry = self._entries.pop(docstring, None)
+            if entry is not None:
+                self._entries[docstring] = entry
+            return entry
+
+    def set(self, docstring, entry):
+        with self._lock:
+            self._entries.pop(docstring, None)
+            self._entries[docstring] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_doctestCache = _DoctestCache()
+
+
+class CheckResult(object):
+    """
+    The outcome of a check, without the scopes and nodes of the checker.
+
+    @ivar filename: The name of the file checked.
+    @ivar messages: The L{messages.Message} instances reported.
+    """
+    __slots__ = ('filename', 'messages')
+
+    def __init__(self, filename, messages):
+        self.filename = filename
+        self.messages = messages
+
+
 def getNodeName(node):
     # Returns node.id, or node.name, or None
     if hasattr(node, 'id'):     # One of the many nodes with an id
@@ -469,6 +601,17 @@ class Checker(object):
     """
     I check the cleanliness and sanity of Python code.
 
+    Checkers can run at the same time in several threads, each on its own
+    tree: the class attributes they change, like C{nodeDepth} and
+    C{offset}, are set on the instance, and the state shared by all the
+    checkers is either never changed after import, like C{builtIns}, or
+    safe to update from several threads, like the doctest cache.  The
+    parents of the nodes are kept by the checker, not set on the nodes, and
+    the nodes whose C{lineno} it shifts are those of the doctests, which each
+    checker compiles itself, so the tree checked is left unchanged and can be
+    shared with other tools and checkers.  A L{pyflakes.profiler.Profiler}
+    may not be shared.
+
     @ivar _deferredFunctions: Tracking list used by L{deferFunction}.  Elements
         of the list are two-tuples.  The first element is the callable passed
         to L{deferFunction}.  The second element is a copy of the scope stack
@@ -476,6 +619,22 @@ class Checker(object):
 
     @ivar _deferredAssignments: Similar to C{_deferredFunctions}, but for
         callables which are deferred assignment checks.
+
+    @ivar _profiler: The L{pyflakes.profiler.Profiler} timing this checker,
+        or C{None}.
+
+    @ivar _passThrough: The node classes whose handler is L{handleChildren},
+        which L{handleNode} traverses without calling the handler.
+
+    @ivar _undefinedNames: The L{messages.UndefinedName} reported so far, by
+        name, for L{GLOBAL} to suppress them.
+
+    @ivar _suppressed: The ids of the messages suppressed by L{GLOBAL}, which
+        are removed from C{messages} at the end of the check.
+
+    @ivar _parents: The parent of each node handled, by node.  Unlike
+        attributes of the nodes, it does not outlive the check: it is set to
+        C{None} once the dead scopes are checked.
     """
 
     _ast_node_scope = {
@@ -500,12 +659,19 @@ class Checker(object):
     del _customBuiltIns
 
     def __init__(self, tree, filename='(none)', builtins=None,
-                 withDoctest='PYFLAKES_DOCTEST' in os.environ):
+                 withDoctest='PYFLAKES_DOCTEST' in os.environ, profiler=None):
         self._nodeHandlers = {}
+        self._passThrough = set()
+        self._profiler = profiler
+        if profiler is not None:
+            self._instrument(profiler)
         self._deferredFunctions = []
         self._deferredAssignments = []
         self.deadScopes = []
         self.messages = []
+        self._undefinedNames = {}
+        self._suppressed = set()
+        self._parents = {}
         self.filename = filename
         if builtins:
             self.builtIns = self.builtIns.union(builtins)
@@ -516,7 +682,10 @@ class Checker(object):
             raise RuntimeError('No scope implemented for the node %r' % tree)
         self.exceptHandlers = [()]
         self.root = tree
-        self.handleChildren(tree)
+        handleChildren = self.handleChildren
+        if profiler is not None:
+            handleChildren = profiler.wrap('first pass', handleChildren)
+        handleChildren(tree)
         self.runDeferred(self._deferredFunctions)
         # Set _deferredFunctions to None so that deferFunction will fail
         # noisily if called after we've run through the deferred functions.
@@ -528,6 +697,49 @@ class Checker(object):
         del self.scopeStack[1:]
         self.popScope()
         self.checkDeadScopes()
+        self._parents = None
+        if self._suppressed:
+            self.messages = [m for m in self.messages
+                             if id(m) not in self._suppressed]
+        self._undefinedNames = self._suppressed = None
+
+    # The methods timed by a profiler, with the name of their measure
+    _profiledMethods = (('runDeferred', 'deferred functions'),
+                        ('checkDeadScopes', 'dead scopes'),
+                        ('differentForks', 'differentForks'),
+                        ('handleDoctests', 'doctests'),
+                        ('_getDoctestExamples', 'doctest parsing'),
+                        ('_compileDoctest', 'doctest compilation'))
+
+    def _instrument(self, profiler):
+        """
+        Time the phases of the check and the expensive operations with
+        C{profiler}, by shadowing the methods on this instance.
+        """
+        for attr, name in self._profiledMethods:
+            setattr(self, attr, profiler.wrap(name, getattr(self, attr)))
+
+    def release(self):
+        """
+        Tear down what the check built, keeping only its messages.
+
+        The scopes, their bindings and the node handlers reference the nodes
+        and the checker itself, so they are only freed by the garbage
+        collector otherwise.  The checker must not check anything afterwards.
+
+        @return: A L{CheckResult}.
+        """
+        for scope in self.deadScopes or ():
+            scope.clear()
+        for scope in self.scopeStack or ():
+            scope.clear()
+        self.deadScopes = self.scopeStack = self.exceptHandlers = None
+        self.root = None
+        self._nodeHandlers = self._passThrough = None
+        self._profiler = None
+        for attr, name in self._profiledMethods:
+            self.__dict__.pop(attr, None)
+        return CheckResult(self.filename, self.messages)
 
     def deferFunction(self, callable):
         """
@@ -610,10 +822,8 @@ class Checker(object):
                                     scope['__all__'].source, name)
 
                 # mark all import '*' as used by the undefined in __all__
-                if scope.importStarred:
-                    for binding in scope.values():
-                        if isinstance(binding, StarImportation):
-                            binding.used = all_binding
+                for name in scope.starImports:
+                    scope[name].used = all_binding
 
             # Look for imported names that aren't used.
             for value in scope.values():
@@ -635,31 +845,68 @@ class Checker(object):
         self.scopeStack.append(scopeClass())
 
     def report(self, messageClass, *args, **kwargs):
-        self.messages.append(messageClass(self.filename, *args, **kwargs))
+        message = messageClass(self.filename, *args, **kwargs)
+        self.messages.append(message)
+        if messageClass is messages.UndefinedName:
+            self._undefinedNames.setdefault(
+                message.message_args[0], []).append(message)
 
     def getParent(self, node):
         # Lookup the first parent which is not Tuple, List or Starred
+        parents = self._parents
         while True:
-            node = node.parent
+            node = parents[node]
             if not hasattr(node, 'elts') and not hasattr(node, 'ctx'):
                 return node
 
+    def _getDepth(self, node):
+        """
+        Return the number of ancestors of C{node}.
+        """
+        parents = self._parents
+        depth = 0
+        while node in parents:
+            node = parents[node]
+            depth += 1
+        return depth
+
     def getCommonAncestor(self, lnode, rnode, stop):
-        if stop in (lnode, rnode) or not (hasattr(lnode, 'parent') and
-                                          hasattr(rnode, 'parent')):
-            return None
-        if lnode is rnode:
-            return lnode
-
-        if (lnode.depth > rnode.depth):
-            return self.getCommonAncestor(lnode.parent, rnode, stop)
-        if (lnode.depth < rnode.depth):
-            return self.getCommonAncestor(lnode, rnode.parent, stop)
-        return self.getCommonAncestor(lnode.parent, rnode.parent, stop)
+        parents = self._parents
+        ldepth = self._getDepth(lnode)
+        rdepth = self._getDepth(rnode)
+        while True:
+            if stop in (lnode, rnode) or not (lnode in parents and
+                                              rnode in parents):
+                return None
+            if lnode is rnode:
+                return lnode
+
+            if ldepth > rdepth:
+                lnode = parents[lnode]
+                ldepth -= 1
+            elif ldepth < rdepth:
+                rnode = parents[rnode]
+                rdepth -= 1
+            else:
+                lnode, rnode = parents[lnode], parents[rnode]
+                ldepth -= 1
+                rdepth -= 1
+
+    def _getLineage(self, node, stop):
+        """
+        Return the ids of C{node} and of its ancestors below C{stop}.
+        """
+        parents = self._parents
+        lineage = set()
+        while node is not stop and node in parents:
+            lineage.add(id(node))
+            node = parents[node]
+        return lineage
 
     def descendantOf(self, node, ancestors, stop):
+        lineage = self._getLineage(node, stop)
         for a in ancestors:
-            if self.getCommonAncestor(node, a, stop):
+            if id(a) in lineage:
                 return True
         return False
 
@@ -680,9 +927,11 @@ class Checker(object):
         ancestor = self.getCommonAncestor(lnode, rnode, self.root)
         parts = getAlternatives(ancestor)
         if parts:
+            llineage = self._getLineage(lnode, ancestor)
+            rlineage = self._getLineage(rnode, ancestor)
             for items in parts:
-                if self.descendantOf(lnode, items, ancestor) ^ \
-                   self.descendantOf(rnode, items, ancestor):
+                ids = set(id(item) for item in items)
+                if bool(ids & llineage) ^ bool(ids & rlineage):
                     return True
         return False
 
@@ -731,7 +980,12 @@ class Checker(object):
             return self._nodeHandlers[node_class]
         except KeyError:
             nodeType = getNodeType(node_class)
-        self._nodeHandlers[node_class] = handler = getattr(self, nodeType)
+        handler = getattr(self, nodeType)
+        if getattr(handler, '__func__', None) is _handleChildren:
+            self._passThrough.add(node_class)
+        if self._profiler is not None:
+            handler = self._profiler.wrapHandler(nodeType, handler)
+        self._nodeHandlers[node_class] = handler
         return handler
 
     def handleNodeLoad(self, node):
@@ -753,11 +1007,9 @@ class Checker(object):
                     # iteration
                     continue
 
-            try:
-                scope[name].used = (self.scope, node)
-            except KeyError:
-                pass
-            else:
+            binding = scope.get(name)
+            if binding is not None:
+                binding.used = (self.scope, node)
                 return
 
             importStarred = importStarred or scope.importStarred
@@ -765,19 +1017,22 @@ class Checker(object):
             if in_generators is not False:
                 in_generators = isinstance(scope, GeneratorScope)
 
-        # look in the built-ins
+        # look in the built-ins, then in those of the scopes
         if name in self.builtIns:
             return
+        for scope in self.scopeStack:
+            if name in scope.builtIns:
+                return
 
         if importStarred:
             from_list = []
 
             for scope in self.scopeStack[-1::-1]:
-                for binding in scope.values():
-                    if isinstance(binding, StarImportation):
-                        # mark '*' imports as used for each scope
-                        binding.used = (self.scope, node)
-                        from_list.append(binding.fullName)
+                for starName in scope.starImports:
+                    # mark '*' imports as used for each scope
+                    binding = scope[starName]
+                    binding.used = (self.scope, node)
+                    from_list.append(binding.fullName)
 
             # report * usage, with a list of possible sources
             from_list = ', '.join(sorted(from_list))
@@ -816,12 +1071,13 @@ class Checker(object):
                     break
 
         parent_stmt = self.getParent(node)
+        parent = self._parents[node]
         if isinstance(parent_stmt, (ast.For, ast.comprehension)) or (
-                parent_stmt != node.parent and
+                parent_stmt != parent and
                 not self.isLiteralTupleUnpacking(parent_stmt)):
             binding = Binding(name, node)
         elif name == '__all__' and isinstance(self.scope, ModuleScope):
-            binding = ExportBinding(name, node.parent, self.scope)
+            binding = ExportBinding(name, parent, self.scope)
         elif isinstance(getattr(node, 'ctx', None), ast.Param):
             binding = Argument(name, self.getScopeNode(node))
         else:
@@ -834,11 +1090,12 @@ class Checker(object):
             """
             Return `True` if node is part of a conditional body.
             """
-            current = getattr(node, 'parent', None)
+            parents = self._parents
+            current = parents.get(node)
             while current:
                 if isinstance(current, (ast.If, ast.While, ast.IfExp)):
                     return True
-                current = getattr(current, 'parent', None)
+                current = parents.get(current)
             return False
 
         name = getNodeName(node)
@@ -859,7 +1116,7 @@ class Checker(object):
                 self.report(messages.UndefinedName, node, name)
 
     def handleChildren(self, tree, omit=None):
-        for node in iter_child_nodes(tree, omit=omit):
+        for node in _child_nodes(tree, omit):
             self.handleNode(node, tree)
 
     def isLiteralTupleUnpacking(self, node):
@@ -892,29 +1149,93 @@ class Checker(object):
         return (node.s, doctest_lineno)
 
     def handleNode(self, node, parent):
+        """
+        Handle C{node}.
+
+        The nodes whose handler is L{handleChildren} are not handed to it:
+        their children are pushed on an explicit stack instead, so that long
+        chains of such nodes, like C{a + b + c + ...}, neither use a few
+        Python frames per level nor hit the recursion limit.  The other
+        handlers are called as usual, and may call L{handleNode} again.
+        """
         if node is None:
             return
-        if self.offset and getattr(node, 'lineno', None) is not None:
-            node.lineno += self.offset[0]
-            node.col_offset += self.offset[1]
-        if self.traceTree:
-            print('  ' * self.nodeDepth + node.__class__.__name__)
-        if self.futuresAllowed and not (isinstance(node, ast.ImportFrom) or
-                                        self.isDocstring(node)):
-            self.futuresAllowed = False
-        self.nodeDepth += 1
-        node.depth = self.nodeDepth
-        node.parent = parent
+        depth = self.nodeDepth
+        passThrough = self._passThrough
+        parents = self._parents
+        stack = [(node, parent)]
         try:
-            handler = self.getNodeHandler(node.__class__)
-            handler(node)
+            while stack:
+                node, parent = stack.pop()
+                if parent is _LEAVE:
+                    self.nodeDepth -= 1
+                    if self.traceTree:
+                        print('  ' * self.nodeDepth + 'end ' +
+                              node.__class__.__name__)
+                    continue
+                if self.offset and getattr(node, 'lineno', None) is not None:
+                    node.lineno += self.offset[0]
+                    node.col_offset += self.offset[1]
+                if self.traceTree:
+                    print('  ' * self.nodeDepth + node.__class__.__name__)
+                if self.futuresAllowed and not (
+                        isinstance(node, ast.ImportFrom) or
+                        self.isDocstring(node)):
+                    self.futuresAllowed = False
+                self.nodeDepth += 1
+                parents[node] = parent
+                handler = self.getNodeHandler(node.__class__)
+                if node.__class__ in passThrough:
+                    if self._profiler is not None:
+                        self._profiler.count(getNodeType(node.__class__))
+                    stack.append((node, _LEAVE))
+                    stack.extend((child, node)
+                                 for child in reversed(_child_nodes(node))
+                                 if child is not None)
+                    continue
+                handler(node)
+                self.nodeDepth -= 1
+                if self.traceTree:
+                    print('  ' * self.nodeDepth + 'end ' +
+                          node.__class__.__name__)
         finally:
-            self.nodeDepth -= 1
-        if self.traceTree:
-            print('  ' * self.nodeDepth + 'end ' + node.__class__.__name__)
+            self.nodeDepth = depth
 
     _getDoctestExamples = doctest.DocTestParser().get_examples
 
+    def _compileDoctest(self, source):
+        return compile(source, "<doctest>", "exec", ast.PyCF_ONLY_AST)
+
+    def _getDoctests(self, docstring):
+        """
+        Return the examples of C{docstring} with their compiled tree, or
+        C{None} if they have a syntax error, using L{_doctestCache}.
+        """
+        cached = _doctestCache.get(docstring)
+        doctests = []
+        if cached is None:
+            cached = []
+            for example in self._getDoctestExamples(docstring):
+                try:
+                    tree = self._compileDoctest(example.source)
+                except SyntaxError:
+                    e = sys.exc_info()[1]
+                    error = (e.lineno, e.offset)
+                    tree = None
+                else:
+                    error = None
+                cached.append((example.source, example.lineno,
+                               example.indent, error))
+                doctests.append((cached[-1], tree))
+            _doctestCache.set(docstring, tuple(cached))
+        else:
+            for example in cached:
+                tree = None
+                if example[3] is None:
+                    tree = self._compileDoctest(example[0])
+                doctests.append((example, tree))
+        return doctests
+
     def handleDoctests(self, node):
         try:
             if hasattr(node, 'docstring'):
@@ -930,7 +1251,7 @@ class Checker(object):
                                       [arg.lineno for arg in node.args.args])
             else:
                 (docstring, node_lineno) = self.getDocstring(node.body[0])
-            examples = docstring and self._getDoctestExamples(docstring)
+            examples = docstring and self._getDoctests(docstring)
         except (ValueError, IndexError):
             # e.g. line 6 of the docstring for <string> has inconsistent
             # leading whitespace: ...
@@ -943,26 +1264,19 @@ class Checker(object):
         self.scopeStack = [self.scopeStack[0]]
         node_offset = self.offset or (0, 0)
         self.pushScope(DoctestScope)
-        underscore_in_builtins = '_' in self.builtIns
-        if not underscore_in_builtins:
-            self.builtIns.add('_')
-        for example in examples:
-            try:
-                tree = compile(example.source, "<doctest>", "exec", ast.PyCF_ONLY_AST)
-            except SyntaxError:
-                e = sys.exc_info()[1]
+        for (source, lineno, indent, error), tree in examples:
+            if error is not None:
+                errorLineno, errorOffset = error
                 if PYPY:
-                    e.offset += 1
-                position = (node_lineno + example.lineno + e.lineno,
-                            example.indent + 4 + (e.offset or 0))
+                    errorOffset += 1
+                position = (node_lineno + lineno + errorLineno,
+                            indent + 4 + (errorOffset or 0))
                 self.report(messages.DoctestSyntaxError, node, position)
             else:
-                self.offset = (node_offset[0] + node_lineno + example.lineno,
-                               node_offset[1] + example.indent + 4)
+                self.offset = (node_offset[0] + node_lineno + lineno,
+                               node_offset[1] + indent + 4)
                 self.handleChildren(tree)
                 self.offset = node_offset
-        if not underscore_in_builtins:
-            self.builtIns.remove('_')
         self.popScope()
         self.scopeStack = saved_stack
 
@@ -1102,10 +1416,8 @@ class Checker(object):
                 # Remove UndefinedName messages already reported for this name.
                 # TODO: if the global is not used in this scope, it does not
                 # become a globally defined name.  See test_unused_global.
-                self.messages = [
-                    m for m in self.messages if not
-                    isinstance(m, messages.UndefinedName) or
-                    m.message_args[0] != node_name]
+                for m in self._undefinedNames.pop(node_name, ()):
+                    self._suppressed.add(id(m))
 
                 # Bind name to global scope if it doesn't exist already.
                 global_scope.setdefault(node_name, node_value)
@@ -1134,7 +1446,7 @@ class Checker(object):
         if isinstance(node.ctx, (ast.Load, ast.AugLoad)):
             self.handleNodeLoad(node)
             if (node.id == 'locals' and isinstance(self.scope, FunctionScope)
-                    and isinstance(node.parent, ast.Call)):
+                    and isinstance(self._parents[node], ast.Call)):
                 # we are doing locals() call in current scope
                 self.scope.usesLocals = True
         elif isinstance(node.ctx, (ast.Store, ast.AugStore, ast.Param)):
@@ -1149,9 +1461,10 @@ class Checker(object):
         # Walk the tree up until we see a loop (OK), a function or class
         # definition (not OK), for 'continue', a finally block (not OK), or
         # the top module scope (not OK)
+        parents = self._parents
         n = node
-        while hasattr(n, 'parent'):
-            n, n_child = n.parent, n
+        while n in parents:
+            n, n_child = parents[n], n
             if isinstance(n, LOOP_TYPES):
                 # Doesn't apply unless it's in the loop itself
                 if n_child not in n.orelse:
@@ -1390,6 +1703,9 @@ class Checker(object):
                 importation = ImportationFrom(name, node,
                                               module, alias.name)
             self.addBinding(node, importation)
+            if (isinstance(importation, StarImportation) and
+                    importation.name not in self.scope.starImports):
+                self.scope.starImports += (importation.name,)
 
     def TRY(self, node):
         handler_names = []
@@ -1475,3 +1791,7 @@ class Checker(object):
         if node.value:
             # If the assignment has value, handle the *value* now.
             self.handleNode(node.value, node)
+
+
+# The function of the handlers which only handle the children of the node.
+_handleChildren = Checker.__dict__['handleChildren']
@@ -0,0 +1,300 @@
+"""
+A pyflakes server listening on a Unix domain socket, and its client.
+
+The server is started with C{pyflakes --daemon} and keeps the checker loaded
+between requests.  The client, C{pyflakes-client} or C{python -m
+pyflakes.daemon}, takes the paths to check, or reads the source from stdin,
+and prints the same output as C{pyflakes}; it does not import the checker
+unless no server is running.  The other options of C{pyflakes} are given to
+the server.
+
+The socket is only used if it belongs to the current user.  When neither
+C{$PYFLAKES_SOCKET} nor C{$XDG_RUNTIME_DIR} gives its path, the socket is in
+a directory of the temporary directory only the current user can access.
+
+Each connection carries one request and one response, both JSON objects
+terminated by a newline.  A request is either C{{"cwd": ..., "paths": [...]}}
+or C{{"source": ..., "filename": ...}}; the response is C{{"stdout": ...,
+"stderr": ..., "warnings": ...}}.
+"""
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+__all__ = ['defaultAddress', 'makeServer', 'serve', 'request', 'main']
+
+# Whether the platform has Unix domain sockets and user ids, which the server
+# and the client require.
+_AVAILABLE = hasattr(socket, 'AF_UNIX') and hasattr(os, 'getuid')
+
+
+def _checkAvailable():
+    if not _AVAILABLE:
+        raise socket.error(errno.EAFNOSUPPORT,
+                           'Unix domain sockets are not available')
+
+
+def _defaultAddress():
+    """
+    Return the path of the socket used when none is given, and whether its
+    directory is the per-user directory which L{serve} must make private.
+    """
+    address = os.environ.get('PYFLAKES_SOCKET')
+    if address:
+        return address, False
+    runtimeDir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtimeDir:
+        return os.path.join(runtimeDir, 'pyflakes.sock'), False
+    return os.path.join(tempfile.gettempdir(),
+                        'pyflakes-%d' % os.getuid(), 'sock'), True
+
+
+def defaultAddress():
+    """
+    Return the path of the socket used when none is given.
+
+    This is C{$PYFLAKES_SOCKET} if it is set, else a path in
+    C{$XDG_RUNTIME_DIR}, or in a per-user directory of the temporary
+    directory.
+    """
+    return _defaultAddress()[0]
+
+
+def _makePrivateDirectory(path):
+    """
+    Create the directory C{path} with access for the current user only, or
+    check that it already is so.
+
+    @raise OSError: If C{path} is not a directory, belongs to another user or
+        can be accessed by other users.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except OSError:
+        if sys.exc_info()[1].errno != errno.EEXIST:
+            raise
+    st = os.lstat(path)
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or
+            st.st_mode & 0o077):
+        raise OSError(errno.EPERM,
+                      'not a directory private to the current user', path)
+
+
+def _checkRequest(req, cache=None, walkOptions=None):
+    """
+    Run the check described by the request C{req}.
+
+    @param cache: A L{pyflakes.cache.ResultCache} used for the checks, pruned
+        after checking paths, as C{pyflakes} does after each run.
+    @param walkOptions: The keyword arguments of L{api.iterSourceCode} used to
+        find the files in the requested paths.
+
+    @return: The response, as a C{dict}.
+    """
+    from pyflakes import api
+    from pyflakes.reporter import Reporter
+    if sys.version_info < (3,):
+        from StringIO import StringIO
+    else:
+        from io import StringIO
+
+    out, err = StringIO(), StringIO()
+    reporter = Reporter(out, err)
+    if 'source' in req:
+        warnings = api.check(req['source'], req.get('filename', '<stdin>'),
+                             reporter)
+    else:
+        warnings = 0
+        for path in req['paths']:
+            # Check relative paths from the client's working directory, but
+            # report them as the client named them.
+            base = os.path.join(req['cwd'], path)
+            warnings += api.checkRecursive(
+                [base], _RenamingReporter(reporter, base, path), cache=cache,
+                **(walkOptions or {}))
+        if cache is not None:
+            cache.prune()
+    return {'stdout': out.getvalue(), 'stderr': err.getvalue(),
+            'warnings': warnings}
+
+
+class _RenamingReporter(object):
+    """
+    Forward reports to another reporter, replacing the C{prefix} of the file
+    names with C{name}.
+    """
+
+    def __init__(self, reporter, prefix, name):
+        self._reporter = reporter
+        self._prefix = prefix
+        self._name = name
+
+    def _rename(self, filename):
+        if filename.startswith(self._prefix):
+            return self._name + filename[len(self._prefix):]
+        return filename
+
+    def unexpectedError(self, filename, msg):
+        self._reporter.unexpectedError(self._rename(filename), msg)
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        self._reporter.syntaxError(self._rename(filename), msg, lineno,
+                                   offset, text)
+
+    def flake(self, message):
+        message.filename = self._rename(message.filename)
+        self._reporter.flake(message)
+
+
+def makeServer(address, cache=None, walkOptions=None):
+    """
+    Create a server listening on the Unix domain socket C{address}.
+
+    A stale socket left by a server which is no longer running is replaced.
+
+    @raise socket.error: If C{address} is in use, or belongs to another
+        user.
+
+    @param cache: A L{pyflakes.cache.ResultCache} used for the checks.
+    @param walkOptions: The keyword arguments of L{api.iterSourceCode} used to
+        find the files in the requested paths.
+    @return: A C{socketserver.UnixStreamServer}; call its C{serve_forever}
+        method to handle requests.
+    """
+    if sys.version_info < (3,):
+        import SocketServer as socketserver
+    else:
+        import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            try:
+                req = json.loads(self.rfile.readline().decode('utf-8'))
+                response = _checkRequest(req, cache, walkOptions)
+            except Exception:
+                response = {'stdout': '', 'warnings': 1,
+                            'stderr': 'pyflakes daemon: %s\n' %
+                                      (sys.exc_info()[1],)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+    if os.path.exists(address):
+        try:
+            _connect(address).close()
+        except socket.error as e:
+            # Only a socket nobody listens on is stale; a socket of another
+            # user is not ours to remove.
+            if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                raise
+            os.remove(address)
+    oldUmask = os.umask(0o077)
+    try:
+        return socketserver.UnixStreamServer(address, Handler)
+    finally:
+        os.umask(oldUmask)
+
+
+def serve(address=None, cache=None, walkOptions=None):
+    """
+    Handle requests on the Unix domain socket C{address} until interrupted.
+
+    The arguments are those of L{makeServer}.  The per-user directory of the
+    default address is created if needed.
+
+    @raise socket.error: If Unix domain sockets are not available, or the
+        server cannot listen on C{address}.
+    """
+    _checkAvailable()
+    if address is None:
+        address, private = _defaultAddress()
+        if private:
+            _makePrivateDirectory(os.path.dirname(address))
+    server = makeServer(address, cache, walkOptions)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(address)
+
+
+def _connect(address):
+    try:
+        owner = os.stat(address).st_uid
+    except OSError:
+        # Let connect report it.
+        owner = os.getuid()
+    if owner != os.getuid():
+        raise socket.error(errno.EPERM,
+                           '%s belongs to another user' % (address,))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except socket.error:
+        sock.close()
+        raise
+    return sock
+
+
+def request(req, address=None):
+    """
+    Send the request C{req} to the server at C{address}.
+
+    @return: The response, as a C{dict}.
+    @raise socket.error: If no server is listening on C{address}, the socket
+        belongs to another user, or Unix domain sockets are not available.
+    """
+    _checkAvailable()
+    if address is None:
+        address = defaultAddress()
+    sock = _connect(address)
+    try:
+        sock.sendall(json.dumps(req).encode('utf-8') + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def main(args=None):
+    """
+    Entry point for the script "pyflakes-client".
+
+    Arguments are the paths to check, optionally preceded by C{--socket
+    PATH}.  Without paths, the source is read from stdin.  Other options are
+    rejected, as the server checks with its own.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    address = None
+    if args[:1] == ['--socket'] and len(args) > 1:
+        address, args = args[1], args[2:]
+    options = [arg for arg in args if arg.startswith('-')]
+    if options:
+        sys.stderr.write('pyflakes-client: unknown option %s; give the '
+                         'options to pyflakes --daemon\n' % (options[0],))
+        raise SystemExit(2)
+    if args:
+        req = {'cwd': os.getcwd(), 'paths': args}
+    else:
+        req = {'source': sys.stdin.read(), 'filename': '<stdin>'}
+    try:
+        response = request(req, address)
+    except socket.error:
+        # No server: check in this process.
+        response = _checkRequest(req)
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    raise SystemExit(response['warnings'] > 0)
+
+
+if __name__ == '__main__':
+    main()
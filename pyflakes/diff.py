@@ -0,0 +1,162 @@
+"""
+Find the Python files and lines changed in a git repository, to check only
+those.
+"""
+import os
+import re
+import subprocess
+
+from pyflakes import api
+
+__all__ = ['DiffError', 'changedLines', 'changedSourceFiles',
+           'LineFilteringReporter', 'ignoredPaths']
+
+_HUNK_REGEX = re.compile(r'^@@ -\S+ \+(\d+)(?:,(\d+))? @@')
+
+
+class DiffError(Exception):
+    """
+    git could not tell what changed.
+    """
+
+
+def _git(args, cwd=None):
+    try:
+        p = subprocess.Popen(['git', '-c', 'core.quotepath=off'] + args,
+                             cwd=cwd, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+    except OSError as e:
+        raise DiffError('cannot run git: %s' % (e,))
+    out, err = p.communicate()
+    if p.returncode:
+        raise DiffError(err.decode('utf-8', 'replace').strip() or
+                        'git exited with status %d' % p.returncode)
+    return out.decode('utf-8', 'replace')
+
+
+def changedLines(ref, cwd=None):
+    """
+    Ask git for the files changed since C{ref}, in the work tree of the
+    repository containing C{cwd}, and for the untracked files.
+
+    @param ref: A git revision, like C{HEAD} or C{origin/master}.
+    @param cwd: A directory of the repository; the current directory by
+        default.
+    @return: A C{dict} mapping the path of each changed file, relative to
+        C{cwd}, to the list of C{(first, last)} ranges of its changed lines,
+        or to C{None} for untracked files.  Deleted files are left out.
+    @raise DiffError: If git fails, for instance outside of a repository.
+    """
+    cwd = cwd or os.getcwd()
+    top = _git(['rev-parse', '--show-toplevel'], cwd).rstrip('\n')
+
+    def local(name):
+        return os.path.relpath(os.path.join(top, name), cwd)
+
+    lines = {}
+    names = _git(['diff', '--name-only', '-z', '--diff-filter=d', ref, '--'],
+                 cwd)
+    for name in names.split('\0'):
+        if name:
+            lines[local(name)] = []
+    # Fix the prefixes, which diff.noprefix or diff.mnemonicPrefix change.
+    patch = _git(['diff', '-U0', '--no-color', '--no-ext-diff',
+                  '--src-prefix=a/', '--dst-prefix=b/',
+                  '--diff-filter=d', ref, '--'], cwd)
+    ranges = None
+    for line in patch.splitlines():
+        if line.startswith('+++ '):
+            name = line[4:].rstrip('\t')
+            ranges = (lines.get(local(name[2:]))
+                      if name.startswith('b/') else None)
+            continue
+        match = _HUNK_REGEX.match(line)
+        if match and ranges is not None:
+            first = int(match.group(1))
+            count = int(match.group(2) or 1)
+            if count:
+                ranges.append((first, first + count - 1))
+    # Unlike git diff, git ls-files only lists the files below its directory.
+    untracked = _git(['ls-files', '--others', '--exclude-standard',
+                      '--full-name', '-z'], top)
+    for name in untracked.split('\0'):
+        if name:
+            lines[local(name)] = None
+    return lines
+
+
+def changedSourceFiles(lines, paths=None):
+    """
+    Select the Python source files among the changed files.
+
+    @param lines: The result of L{changedLines}.
+    @param paths: If given, only the files which are or are below one of
+        these paths are selected.
+    @return: The sorted list of the selected paths.
+    """
+    roots = [os.path.abspath(path) for path in paths or ()]
+    selected = []
+    for path in sorted(lines):
+        if roots:
+            full = os.path.abspath(path)
+            if not any(full == root or full.startswith(root + os.sep)
+                       for root in roots):
+                continue
+        if api.isPythonFile(path):
+            selected.append(path)
+    return selected
+
+
+def ignoredPaths(directory):
+    """
+    Ask git for the untracked files and directories it ignores in
+    C{directory}.
+
+    @return: A C{set} of the paths, joined to C{directory}; it is empty if
+        C{directory} is not in a git repository or git is not available.
+    """
+    try:
+        names = _git(['ls-files', '-z', '--others', '--ignored',
+                      '--exclude-standard', '--directory'], directory)
+    except DiffError:
+        return set()
+    return set(os.path.join(directory, *name.rstrip('/').split('/'))
+               for name in names.split('\0') if name)
+
+
+class LineFilteringReporter(object):
+    """
+    Pass on to another reporter the warnings on changed lines only, and all
+    the errors.
+
+    @ivar warnings: The number of warnings and errors passed on.
+    """
+
+    def __init__(self, reporter, lines):
+        """
+        @param reporter: The reporter to pass the problems on to.
+        @param lines: The changed lines, as returned by L{changedLines}.
+        """
+        self.reporter = reporter
+        self.lines = lines
+        self.warnings = 0
+
+    def unexpectedError(self, filename, msg):
+        self.warnings += 1
+        self.reporter.unexpectedError(filename, msg)
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        self.warnings += 1
+        self.reporter.syntaxError(filename, msg, lineno, offset, text)
+
+    def fileChecked(self):
+        fileChecked = getattr(self.reporter, 'fileChecked', None)
+        if fileChecked is not None:
+            fileChecked()
+
+    def flake(self, message):
+        ranges = self.lines.get(message.filename, ())
+        if ranges is None or any(first <= message.lineno <= last
+                                 for first, last in ranges):
+            self.warnings += 1
+            self.reporter.flake(message)
@@ -0,0 +1,286 @@
+"""
+Check a new version of a module, reusing the results for the top-level
+definitions which did not change since the previous check.
+"""
+import ast
+import hashlib
+import os
+
+from pyflakes import checker, messages
+
+__all__ = ['IncrementalChecker']
+
+_DEFINITION_TYPES = tuple(
+    getattr(ast, name) for name in ('FunctionDef', 'AsyncFunctionDef',
+                                    'ClassDef')
+    if hasattr(ast, name))
+
+_GLOBAL_TYPES = tuple(
+    getattr(ast, name) for name in ('Global', 'Nonlocal')
+    if hasattr(ast, name))
+
+# The messages citing the line of another node, which may be outside of the
+# definition reporting them.
+_CITING_LINES = (messages.RedefinedWhileUnused, messages.RedefinedInListComp,
+                 messages.ImportShadowedByLoopVar, messages.UndefinedLocal)
+
+
+def _fingerprint(node):
+    """
+    Digest the fields of C{node} and of the nodes below it, with their
+    positions relative to the line of C{node}, so that a definition which
+    only moved keeps its digest.
+
+    @return: The digest, or C{None} if C{node} is too deep to be dumped.
+    """
+    try:
+        dump = ast.dump(node)
+    except RuntimeError:
+        # RecursionError, from Python 3.5.
+        return None
+    digest = hashlib.sha1(dump.encode('utf-8'))
+    for child in ast.walk(node):
+        lineno = getattr(child, 'lineno', None)
+        if lineno is not None:
+            endLineno = getattr(child, 'end_lineno', None)
+            digest.update(repr((
+                lineno - node.lineno, child.col_offset,
+                endLineno and endLineno - node.lineno,
+                getattr(child, 'end_col_offset', None))).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _shifted(message, delta):
+    """
+    Return a copy of C{message} reported C{delta} lines further.
+    """
+    copy = messages.Message.__new__(message.__class__)
+    copy.filename = message.filename
+    copy.lineno = message.lineno + delta
+    copy.col = message.col
+    copy.message_args = message.message_args
+    return copy
+
+
+class _Definition(object):
+    """
+    What checking the deferred parts of a top-level definition produced.
+
+    @ivar lineno: The line of the definition.
+    @ivar messages: The messages reported while running the deferred
+        functions of the definition and checking the scopes they created.
+    @ivar used: Names of module scope bindings used by these functions.
+    @ivar reusable: False if the functions had an effect on the module scope
+        which cannot be replayed, or reported a message citing another line.
+    @ivar reuse: True if the deferred functions are not run, and the result
+        of the previous check is replayed instead.
+    """
+    __slots__ = ('lineno', 'messages', 'used', 'reusable', 'reuse',
+                 'replayed')
+
+    def __init__(self, lineno):
+        self.lineno = lineno
+        self.messages = []
+        self.used = set()
+        self.reusable = True
+        self.reuse = False
+        self.replayed = False
+
+
+class IncrementalChecker(checker.Checker):
+    """
+    A L{checker.Checker} which reuses the result of a previous check of the
+    same module.
+
+    The bodies of top-level functions and classes are checked by deferred
+    functions, once the module scope is complete.  If the module scope has the
+    same names bound by the same kinds of bindings as in the previous check,
+    the deferred functions of each top-level definition which is identical,
+    though maybe moved to other lines, are not run; the messages they
+    reported, moved along, and the module scope bindings they used are
+    replayed instead.  Anything else is a full check, as is the check of a
+    module with a definition too deep to be compared.
+
+    Only the results are kept from the previous checker, so it may be
+    discarded once this one is created.
+
+    @ivar reusedDefinitions: The number of top-level definitions whose result
+        was reused.
+    """
+
+    def __init__(self, tree, filename='(none)', builtins=None,
+                 withDoctest='PYFLAKES_DOCTEST' in os.environ,
+                 profiler=None, previous=None):
+        self._previous = previous
+        self._definitions = {}
+        self._definitionNodes = {}
+        self._definition = None
+        self._deferredPhase = False
+        self._scopeDefinitions = {}
+        self._signature = None
+        self._sawGlobal = False
+        self._unkeyed = False
+        self.reusedDefinitions = 0
+        try:
+            super(IncrementalChecker, self).__init__(
+                tree, filename, builtins, withDoctest, profiler)
+        finally:
+            self._previous = None
+            self._definition = None
+            self._definitionNodes = None
+
+    def handleChildren(self, tree, omit=None):
+        if tree is not self.root or not isinstance(tree, ast.Module):
+            return super(IncrementalChecker, self).handleChildren(tree, omit)
+        # Attribute what is deferred to the top-level statement handled.
+        for node in checker.iter_child_nodes(tree, omit=omit):
+            self._definition = None
+            if isinstance(node, _DEFINITION_TYPES):
+                key = _fingerprint(node)
+                self._definition = _Definition(node.lineno)
+                if key is None:
+                    self._unkeyed = True
+                else:
+                    self._definitions[key] = self._definition
+                    self._definitionNodes[key] = node
+            self.handleNode(node, tree)
+        self._definition = None
+
+    def deferFunction(self, callable):
+        super(IncrementalChecker, self).deferFunction(self._own(callable))
+
+    def deferAssignment(self, callable):
+        super(IncrementalChecker, self).deferAssignment(self._own(callable))
+
+    def _own(self, callable):
+        """
+        Wrap C{callable} to run on behalf of the current definition, or to
+        replay its previous result.
+        """
+        definition = self._definition
+
+        def run():
+            saved = self._definition
+            self._definition = definition
+            try:
+                if definition is not None and definition.reuse:
+                    self._replay(definition)
+                else:
+                    callable()
+            finally:
+                self._definition = saved
+        return run
+
+    def runDeferred(self, deferred):
+        if not self._deferredPhase:
+            self._deferredPhase = True
+            self._signature = self._moduleSignature()
+            self._chooseReused()
+        super(IncrementalChecker, self).runDeferred(deferred)
+
+    def _moduleSignature(self):
+        scope = self.scopeStack[0]
+        return (scope.importStarred, sorted(
+            (name, binding.__class__.__name__)
+            for name, binding in scope.items()))
+
+    def _chooseReused(self):
+        previous = self._previous
+        if (previous is None or self._unkeyed or
+                not isinstance(previous, IncrementalChecker) or
+                previous._sawGlobal or
+                previous._signature != self._signature or
+                previous.filename != self.filename or
+                previous.builtIns != self.builtIns or
+                previous.withDoctest != self.withDoctest):
+            return
+        reused = {}
+        for key, definition in self._definitions.items():
+            old = previous._definitions.get(key)
+            if old is not None and old.reusable:
+                reused[key] = old
+            elif any(isinstance(node, _GLOBAL_TYPES)
+                     for node in ast.walk(self._definitionNodes[key])):
+                # Its 'global' statements will change the module scope.
+                return
+        for key, old in reused.items():
+            definition = self._definitions[key]
+            delta = definition.lineno - old.lineno
+            if delta:
+                definition.messages = [_shifted(message, delta)
+                                       for message in old.messages]
+            else:
+                definition.messages = old.messages
+            definition.used = old.used
+            definition.reuse = True
+        self.reusedDefinitions = len(reused)
+
+    def _replay(self, definition):
+        if definition.replayed:
+            return
+        definition.replayed = True
+        self.messages.extend(definition.messages)
+        scope = self.scopeStack[0]
+        for name in definition.used:
+            binding = scope.get(name)
+            if binding is not None:
+                binding.used = (scope, binding.source)
+
+    def pushScope(self, scopeClass=checker.FunctionScope):
+        super(IncrementalChecker, self).pushScope(scopeClass)
+        if self._deferredPhase and self._definition is not None:
+            self._scopeDefinitions[id(self.scope)] = self._definition
+
+    def report(self, messageClass, *args, **kwargs):
+        super(IncrementalChecker, self).report(messageClass, *args, **kwargs)
+        if self._deferredPhase and self._definition is not None:
+            self._definition.messages.append(self.messages[-1])
+            if messageClass in _CITING_LINES:
+                self._definition.reusable = False
+
+    def handleNodeLoad(self, node):
+        super(IncrementalChecker, self).handleNodeLoad(node)
+        if not self._deferredPhase or self._definition is None:
+            return
+        scope = self.scopeStack[0]
+        name = checker.getNodeName(node)
+        binding = scope.get(name)
+        if binding is not None and binding.used and binding.used[1] is node:
+            self._definition.used.add(name)
+        else:
+            for name in scope.starImports:
+                if scope[name].used and scope[name].used[1] is node:
+                    self._definition.used.add(name)
+
+    def addBinding(self, node, value):
+        existing = self.scopeStack[0].get(value.name)
+        redefined = len(getattr(existing, 'redefined', ()))
+        super(IncrementalChecker, self).addBinding(node, value)
+        if (self._deferredPhase and self._definition is not None and
+                len(getattr(existing, 'redefined', ())) != redefined):
+            # checkDeadScopes will report this node of the module scope.
+            self._definition.reusable = False
+
+    def GLOBAL(self, node):
+        if self._deferredPhase:
+            self._sawGlobal = True
+        super(IncrementalChecker, self).GLOBAL(node)
+
+    NONLOCAL = GLOBAL
+
+    def checkDeadScopes(self):
+        # Check the scopes of each definition on its behalf.
+        deadScopes = self.deadScopes
+        groups = {}
+        for scope in deadScopes:
+            definition = self._scopeDefinitions.get(id(scope))
+            groups.setdefault(id(definition), (definition, []))[1].append(
+                scope)
+        try:
+            for definition, scopes in groups.values():
+                self._definition = definition
+                self.deadScopes = scopes
+                super(IncrementalChecker, self).checkDeadScopes()
+        finally:
+            self._definition = None
+            self.deadScopes = deadScopes
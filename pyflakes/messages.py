@@ -1,16 +1,24 @@
 """
 Provide the class Message and its subclasses.
 """
+from array import array
 
 
 class Message(object):
+    """
+    A problem found in a file.
+
+    Messages are slotted, since a check of a large tree creates many of them;
+    subclasses must declare C{__slots__} too.
+    """
+    __slots__ = ('filename', 'lineno', 'col', 'message_args')
     message = ''
-    message_args = ()
 
     def __init__(self, filename, loc):
         self.filename = filename
         self.lineno = loc.lineno
         self.col = getattr(loc, 'col_offset', 0)
+        self.message_args = ()
 
     def __str__(self):
         return '%s:%s: %s' % (self.filename, self.lineno,
@@ -19,6 +27,7 @@ class Message(object):
 
 class UnusedImport(Message):
     message = '%r imported but unused'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name):
         Message.__init__(self, filename, loc)
@@ -27,6 +36,7 @@ class UnusedImport(Message):
 
 class RedefinedWhileUnused(Message):
     message = 'redefinition of unused %r from line %r'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name, orig_loc):
         Message.__init__(self, filename, loc)
@@ -35,6 +45,7 @@ class RedefinedWhileUnused(Message):
 
 class RedefinedInListComp(Message):
     message = 'list comprehension redefines %r from line %r'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name, orig_loc):
         Message.__init__(self, filename, loc)
@@ -43,6 +54,7 @@ class RedefinedInListComp(Message):
 
 class ImportShadowedByLoopVar(Message):
     message = 'import %r from line %r shadowed by loop variable'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name, orig_loc):
         Message.__init__(self, filename, loc)
@@ -51,6 +63,7 @@ class ImportShadowedByLoopVar(Message):
 
 class ImportStarNotPermitted(Message):
     message = "'from %s import *' only allowed at module level"
+    __slots__ = ()
 
     def __init__(self, filename, loc, modname):
         Message.__init__(self, filename, loc)
@@ -59,6 +72,7 @@ class ImportStarNotPermitted(Message):
 
 class ImportStarUsed(Message):
     message = "'from %s import *' used; unable to detect undefined names"
+    __slots__ = ()
 
     def __init__(self, filename, loc, modname):
         Message.__init__(self, filename, loc)
@@ -67,6 +81,7 @@ class ImportStarUsed(Message):
 
 class ImportStarUsage(Message):
     message = "%r may be undefined, or defined from star imports: %s"
+    __slots__ = ()
 
     def __init__(self, filename, loc, name, from_list):
         Message.__init__(self, filename, loc)
@@ -75,6 +90,7 @@ class ImportStarUsage(Message):
 
 class UndefinedName(Message):
     message = 'undefined name %r'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name):
         Message.__init__(self, filename, loc)
@@ -83,6 +99,7 @@ class UndefinedName(Message):
 
 class DoctestSyntaxError(Message):
     message = 'syntax error in doctest'
+    __slots__ = ()
 
     def __init__(self, filename, loc, position=None):
         Message.__init__(self, filename, loc)
@@ -93,6 +110,7 @@ class DoctestSyntaxError(Message):
 
 class UndefinedExport(Message):
     message = 'undefined name %r in __all__'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name):
         Message.__init__(self, filename, loc)
@@ -102,6 +120,7 @@ class UndefinedExport(Message):
 class UndefinedLocal(Message):
     message = ('local variable %r (defined in enclosing scope on line %r) '
                'referenced before assignment')
+    __slots__ = ()
 
     def __init__(self, filename, loc, name, orig_loc):
         Message.__init__(self, filename, loc)
@@ -110,6 +129,7 @@ class UndefinedLocal(Message):
 
 class DuplicateArgument(Message):
     message = 'duplicate argument %r in function definition'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name):
         Message.__init__(self, filename, loc)
@@ -118,6 +138,7 @@ class DuplicateArgument(Message):
 
 class MultiValueRepeatedKeyLiteral(Message):
     message = 'dictionary key %r repeated with different values'
+    __slots__ = ()
 
     def __init__(self, filename, loc, key):
         Message.__init__(self, filename, loc)
@@ -126,6 +147,7 @@ class MultiValueRepeatedKeyLiteral(Message):
 
 class MultiValueRepeatedKeyVariable(Message):
     message = 'dictionary key variable %s repeated with different values'
+    __slots__ = ()
 
     def __init__(self, filename, loc, key):
         Message.__init__(self, filename, loc)
@@ -134,6 +156,7 @@ class MultiValueRepeatedKeyVariable(Message):
 
 class LateFutureImport(Message):
     message = 'from __future__ imports must occur at the beginning of the file'
+    __slots__ = ()
 
     def __init__(self, filename, loc, names):
         Message.__init__(self, filename, loc)
@@ -143,6 +166,7 @@ class LateFutureImport(Message):
 class FutureFeatureNotDefined(Message):
     """An undefined __future__ feature name was imported."""
     message = 'future feature %s is not defined'
+    __slots__ = ()
 
     def __init__(self, filename, loc, name):
         Message.__init__(self, filename, loc)
@@ -155,6 +179,7 @@ class UnusedVariable(Message):
     used.
     """
     message = 'local variable %r is assigned to but never used'
+    __slots__ = ()
 
     def __init__(self, filename, loc, names):
         Message.__init__(self, filename, loc)
@@ -166,6 +191,7 @@ class ReturnWithArgsInsideGenerator(Message):
     Indicates a return statement with arguments inside a generator.
     """
     message = '\'return\' with argument inside generator'
+    __slots__ = ()
 
 
 class ReturnOutsideFunction(Message):
@@ -173,6 +199,7 @@ class ReturnOutsideFunction(Message):
     Indicates a return statement outside of a function/method.
     """
     message = '\'return\' outside function'
+    __slots__ = ()
 
 
 class YieldOutsideFunction(Message):
@@ -180,6 +207,7 @@ class YieldOutsideFunction(Message):
     Indicates a yield or yield from statement outside of a function/method.
     """
     message = '\'yield\' outside function'
+    __slots__ = ()
 
 
 # For whatever reason, Python gives different error messages for these two. We
@@ -189,6 +217,7 @@ class ContinueOutsideLoop(Message):
     Indicates a continue statement outside of a while or for loop.
     """
     message = '\'continue\' not properly in loop'
+    __slots__ = ()
 
 
 class BreakOutsideLoop(Message):
@@ -196,6 +225,7 @@ class BreakOutsideLoop(Message):
     Indicates a break statement outside of a while or for loop.
     """
     message = '\'break\' outside loop'
+    __slots__ = ()
 
 
 class ContinueInFinally(Message):
@@ -203,6 +233,7 @@ class ContinueInFinally(Message):
     Indicates a continue statement in a finally block in a while or for loop.
     """
     message = '\'continue\' not supported inside \'finally\' clause'
+    __slots__ = ()
 
 
 class DefaultExceptNotLast(Message):
@@ -210,6 +241,7 @@ class DefaultExceptNotLast(Message):
     Indicates an except: block as not the last exception handler.
     """
     message = 'default \'except:\' must be last'
+    __slots__ = ()
 
 
 class TwoStarredExpressions(Message):
@@ -217,6 +249,7 @@ class TwoStarredExpressions(Message):
     Two or more starred expressions in an assignment (a, *b, *c = d).
     """
     message = 'two starred expressions in assignment'
+    __slots__ = ()
 
 
 class TooManyExpressionsInStarredAssignment(Message):
@@ -224,6 +257,7 @@ class TooManyExpressionsInStarredAssignment(Message):
     Too many expressions in an assignment with star-unpacking
     """
     message = 'too many expressions in star-unpacking assignment'
+    __slots__ = ()
 
 
 class AssertTuple(Message):
@@ -231,10 +265,12 @@ class AssertTuple(Message):
     Assertion test is a tuple, which are always True.
     """
     message = 'assertion is always true, perhaps remove parentheses?'
+    __slots__ = ()
 
 
 class ForwardAnnotationSyntaxError(Message):
     message = 'syntax error in forward annotation %r'
+    __slots__ = ()
 
     def __init__(self, filename, loc, annotation):
         Message.__init__(self, filename, loc)
@@ -243,3 +279,66 @@ class ForwardAnnotationSyntaxError(Message):
 
 class RaiseNotImplemented(Message):
     message = "'raise NotImplemented' should be 'raise NotImplementedError'"
+    __slots__ = ()
+
+
+class MessageRecords(object):
+    """
+    A compact list of the messages reported for one file.
+
+    The class, line, column and arguments of the messages are kept in arrays,
+    and the filename once, rather than as L{Message} instances.  This makes
+    them cheaper to keep, to count, and to pickle for another process or for
+    the cache.  Iterating creates the L{Message} instances, whose text is only
+    formatted by C{str}.
+    """
+    __slots__ = ('filename', '_classes', '_codes', '_lines', '_cols', '_args')
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._classes = []
+        self._codes = array('H')
+        self._lines = array('l')
+        self._cols = array('l')
+        self._args = []
+
+    def append(self, message):
+        """
+        Record C{message}, which must be reported against C{filename}.
+        """
+        classes = self._classes
+        try:
+            code = classes.index(message.__class__)
+        except ValueError:
+            code = len(classes)
+            classes.append(message.__class__)
+        self._codes.append(code)
+        self._lines.append(message.lineno)
+        self._cols.append(message.col)
+        self._args.append(message.message_args)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __iter__(self):
+        classes = self._classes
+        for code, lineno, col, args in zip(self._codes, self._lines,
+                                           self._cols, self._args):
+            message = Message.__new__(classes[code])
+            message.filename = self.filename
+            message.lineno = lineno
+            message.col = col
+            message.message_args = args
+            yield message
+
+    def withFilename(self, filename):
+        """
+        Return the same records, reported against C{filename}.
+        """
+        records = MessageRecords(filename)
+        records._classes = self._classes
+        records._codes = self._codes
+        records._lines = self._lines
+        records._cols = self._cols
+        records._args = self._args
+        return records
@@ -0,0 +1,110 @@
+"""
+Provide the Profiler class, which measures where a checker spends its time.
+"""
+from __future__ import division
+
+import time
+
+__all__ = ['Profiler']
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class Profiler(object):
+    """
+    Accumulate the time spent by L{pyflakes.checker.Checker} instances.
+
+    A checker given a profiler times each of its node handlers, the phases of
+    the check and some expensive operations.  The time of a handler excludes
+    the time of the handlers it calls for the child nodes; the time of the
+    other entries includes everything they call.
+
+    @ivar handlers: C{[calls, seconds]} by handler name, e.g. C{'NAME'}.
+    @ivar phases: C{[calls, seconds]} by phase or operation name.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.phases = {}
+        self._stack = []
+
+    def wrapHandler(self, name, handler):
+        """
+        Return C{handler} timed under C{name}.
+        """
+        stats = self.handlers.setdefault(name, [0, 0.0])
+        stack = self._stack
+
+        def timedHandler(node):
+            stack.append(0.0)
+            start = _timer()
+            try:
+                return handler(node)
+            finally:
+                elapsed = _timer() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                stats[0] += 1
+                stats[1] += elapsed - children
+        return timedHandler
+
+    def count(self, name):
+        """
+        Count a call of the handler C{name} which was not timed, as the checker
+        handles the children of some nodes without calling their handler.
+        Their time is part of the time of the closest handler called.
+        """
+        self.handlers.setdefault(name, [0, 0.0])[0] += 1
+
+    def wrap(self, name, func):
+        """
+        Return C{func} timed as the phase or operation C{name}.
+        """
+        stats = self.phases.setdefault(name, [0, 0.0])
+
+        def timed(*args, **kwargs):
+            start = _timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += _timer() - start
+        return timed
+
+    def merge(self, data):
+        """
+        Add the measures of another profiler, as returned by its L{asDict}.
+        """
+        for mine, theirs in ((self.handlers, data['handlers']),
+                             (self.phases, data['phases'])):
+            for name, (calls, seconds) in theirs.items():
+                stats = mine.setdefault(name, [0, 0.0])
+                stats[0] += calls
+                stats[1] += seconds
+
+    def asDict(self):
+        """
+        Return the measures as a C{dict} suitable for JSON.
+        """
+        return {'handlers': dict((name, list(stats))
+                                 for name, stats in self.handlers.items()),
+                'phases': dict((name, list(stats))
+                               for name, stats in self.phases.items())}
+
+    def formatTable(self):
+        """
+        Return the measures as a table, by decreasing time.
+        """
+        lines = []
+        for title, entries in (('handler', self.handlers),
+                               ('phase', self.phases)):
+            lines.append('%-24s %10s %12s %12s' % (
+                title, 'calls', 'time (s)', 'per call (us)'))
+            for name, (calls, seconds) in sorted(
+                    entries.items(), key=lambda item: -item[1][1]):
+                lines.append('%-24s %10d %12.6f %12.2f' % (
+                    name, calls, seconds,
+                    seconds / calls * 1e6 if calls else 0))
+            lines.append('')
+        return '\n'.join(lines)
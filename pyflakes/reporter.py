@@ -1,9 +1,29 @@
 """
-Provide the Reporter class.
+Provide the Reporter, JSONLinesReporter and NullReporter classes.
 """
 
+import json
 import re
 import sys
+import time
+
+_timer = getattr(time, 'monotonic', time.time)
+
+
+def _jsonArg(arg):
+    """
+    Prepare a message argument for C{json.dumps}, whose C{default} does not
+    apply to the C{str} of Python 2: it is decoded, or replaced with its
+    C{repr} when it is not UTF-8.
+    """
+    if isinstance(arg, (tuple, list)):
+        return [_jsonArg(item) for item in arg]
+    if sys.version_info < (3,) and isinstance(arg, str):
+        try:
+            return arg.decode('utf-8')
+        except UnicodeDecodeError:
+            return repr(arg)
+    return arg
 
 
 class Reporter(object):
@@ -74,6 +94,116 @@ class Reporter(object):
         self._stdout.write('\n')
 
 
+class JSONLinesReporter(object):
+    """
+    Reports the results of pyflakes checks as JSON objects, one per line.
+
+    Each warning is an object with the C{filename}, C{line}, C{column} (from
+    1), C{type} (the name of the message class) and C{args} of the message.
+    Errors are objects with a C{type} of C{"SyntaxError"} or
+    C{"UnexpectedError"} and a C{message}, instead of C{args}.  The arguments
+    which JSON cannot represent, like the bytes keys of a dict literal, are
+    written as their C{repr}.
+
+    The lines are buffered, and written when the buffer is full or when the
+    oldest one waited for C{flushInterval} seconds, so that the results
+    stream out as files are checked: the wait is also checked whenever a file
+    is checked, by L{fileChecked}.  L{flush} must be called at the end.
+    """
+
+    def __init__(self, stream, bufferSize=1 << 16, flushInterval=1.0):
+        """
+        Construct a L{JSONLinesReporter}.
+
+        @param stream: A file-like object where the objects will be written
+            to.  C{sys.stdout} is a good value.
+        @param bufferSize: The number of characters buffered before they are
+            written.
+        @param flushInterval: The number of seconds after which buffered
+            lines are written.
+        """
+        self._stream = stream
+        self._bufferSize = bufferSize
+        self._flushInterval = flushInterval
+        self._buffer = []
+        self._buffered = 0
+        self._deadline = None
+
+    def _write(self, record):
+        line = json.dumps(record, sort_keys=True, default=repr) + '\n'
+        self._buffer.append(line)
+        self._buffered += len(line)
+        now = _timer()
+        if self._deadline is None:
+            self._deadline = now + self._flushInterval
+        if self._buffered >= self._bufferSize or now >= self._deadline:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered lines.
+        """
+        if self._buffer:
+            self._stream.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        self._deadline = None
+        if hasattr(self._stream, 'flush'):
+            self._stream.flush()
+
+    def fileChecked(self):
+        """
+        The check of a file is over: write the buffered lines if the oldest
+        one waited for C{flushInterval} seconds.
+        """
+        if self._deadline is not None and _timer() >= self._deadline:
+            self.flush()
+
+    def unexpectedError(self, filename, msg):
+        """
+        An unexpected error occurred trying to process C{filename}.
+        """
+        self._write({'filename': filename, 'type': 'UnexpectedError',
+                     'message': msg})
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        """
+        There was a syntax error in C{filename}.
+        """
+        if offset is not None:
+            line = text.splitlines()[-1]
+            offset = offset - (len(text) - len(line)) + 1
+        self._write({'filename': filename, 'line': lineno, 'column': offset,
+                     'type': 'SyntaxError', 'message': msg})
+
+    def flake(self, message):
+        """
+        pyflakes found something wrong with the code.
+
+        @param: A L{pyflakes.messages.Message}.
+        """
+        self._write({'filename': message.filename, 'line': message.lineno,
+                     'column': message.col + 1,
+                     'type': message.__class__.__name__,
+                     'args': _jsonArg(message.message_args)})
+
+
+class NullReporter(object):
+    """
+    Ignores the results of pyflakes checks, for when only the number of
+    warnings matters.  The messages are never formatted.
+    """
+
+    def unexpectedError(self, filename, msg):
+        pass
+
+    def syntaxError(self, filename, msg, lineno, offset, text):
+        pass
+
+    def flake(self, message):
+        pass
+
+
 def _makeDefaultReporter():
     """
     Make a reporter that can be used when no reporter is specified.
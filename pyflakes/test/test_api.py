@@ -2,6 +2,8 @@
 Tests for L{pyflakes.scripts.pyflakes}.
 """
 
+import itertools
+import json
 import os
 import sys
 import shutil
@@ -9,13 +11,15 @@ import subprocess
 import tempfile
 
 from pyflakes.checker import PY2
-from pyflakes.messages import UnusedImport
-from pyflakes.reporter import Reporter
+from pyflakes.messages import MultiValueRepeatedKeyLiteral, UnusedImport
+from pyflakes.reporter import Reporter, JSONLinesReporter
 from pyflakes.api import (
     main,
+    checkMany,
     checkPath,
     checkRecursive,
     iterSourceCode,
+    _prefetch,
 )
 from pyflakes.test.harness import TestCase, skipIf
 
@@ -242,6 +246,64 @@ class TestIterSourceCode(TestCase):
         self.assertEqual(list(iterSourceCode([epath])),
                          [epath])
 
+    def test_prunedDirectories(self):
+        """
+        L{iterSourceCode} does not recurse into version control, cache and
+        dependency directories, nor into virtualenvs, unless they are given.
+        """
+        for name in ('.git', 'node_modules', '__pycache__', 'venv'):
+            os.mkdir(os.path.join(self.tempdir, name))
+            self.makeEmptyFile(name, 'a.py')
+        self.makeEmptyFile('venv', 'pyvenv.cfg')
+        bpath = self.makeEmptyFile('b.py')
+        self.assertEqual(list(iterSourceCode([self.tempdir])), [bpath])
+        venv = os.path.join(self.tempdir, 'venv')
+        self.assertEqual(list(iterSourceCode([venv])),
+                         [os.path.join(venv, 'a.py')])
+
+    def test_noPrune(self):
+        """
+        Without pruning, L{iterSourceCode} recurses into every directory, and
+        directories named like build output are always recursed into.
+        """
+        for name in ('node_modules', 'venv', 'build'):
+            os.mkdir(os.path.join(self.tempdir, name))
+            self.makeEmptyFile(name, 'a.py')
+        self.makeEmptyFile('venv', 'pyvenv.cfg')
+        buildPath = os.path.join(self.tempdir, 'build', 'a.py')
+        self.assertEqual(list(iterSourceCode([self.tempdir])), [buildPath])
+        self.assertEqual(
+            sorted(iterSourceCode([self.tempdir], prune=False)),
+            sorted([buildPath,
+                    os.path.join(self.tempdir, 'node_modules', 'a.py'),
+                    os.path.join(self.tempdir, 'venv', 'a.py')]))
+
+    def test_exclude(self):
+        """
+        The files and directories whose name or path matches one of the
+        patterns given to L{iterSourceCode} are skipped.
+        """
+        os.mkdir(os.path.join(self.tempdir, 'foo'))
+        self.makeEmptyFile('foo', 'a.py')
+        os.mkdir(os.path.join(self.tempdir, 'bar'))
+        bpath = self.makeEmptyFile('bar', 'b.py')
+        self.makeEmptyFile('bar', 'test_b.py')
+        self.assertEqual(
+            list(iterSourceCode([self.tempdir],
+                                exclude=['test_*', '*%sfoo' % os.sep])),
+            [bpath])
+
+    def test_noShebang(self):
+        """
+        Without shebang sniffing, only the files ending with .py are found.
+        """
+        with open(os.path.join(self.tempdir, 'a'), 'w') as fd:
+            fd.write('#!/usr/bin/env python\n')
+        bpath = self.makeEmptyFile('b.py')
+        self.assertEqual(
+            list(iterSourceCode([self.tempdir], sniffShebang=False)),
+            [bpath])
+
 
 class TestReporter(TestCase):
     """
@@ -319,6 +381,98 @@ class TestReporter(TestCase):
         self.assertEqual(out.getvalue(), "%s\n" % (message,))
 
 
+class TestJSONLinesReporter(TestCase):
+    """
+    Tests for L{JSONLinesReporter}.
+    """
+
+    def records(self, out):
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_flake(self):
+        """
+        C{flake} writes the location, class and arguments of the message.
+        """
+        out = StringIO()
+        reporter = JSONLinesReporter(out)
+        reporter.flake(UnusedImport('foo.py', Node(42, 4), 'bar'))
+        self.assertEqual(out.getvalue(), '')
+        reporter.flush()
+        self.assertEqual(self.records(out), [
+            {'filename': 'foo.py', 'line': 42, 'column': 5,
+             'type': 'UnusedImport', 'args': ['bar']}])
+
+    def test_unserializableArgs(self):
+        """
+        The arguments JSON cannot represent, like bytes and complex keys of a
+        dict literal, are written as their repr.
+        """
+        out = StringIO()
+        reporter = JSONLinesReporter(out)
+        for key in (b'a', b'\xff', 1j, (b'a', 2j)):
+            reporter.flake(
+                MultiValueRepeatedKeyLiteral('foo.py', Node(1), key))
+        reporter.flush()
+        if sys.version_info < (3,):
+            # b'a' is the str 'a', and only undecodable ones are repr'ed.
+            bytesA = 'a'
+        else:
+            bytesA = repr(b'a')
+        self.assertEqual([record['args'] for record in self.records(out)],
+                         [[bytesA], [repr(b'\xff')], [repr(1j)],
+                          [[bytesA, repr(2j)]]])
+
+    def test_errors(self):
+        """
+        Errors are written as objects with a message.
+        """
+        out = StringIO()
+        reporter = JSONLinesReporter(out)
+        reporter.syntaxError('foo.py', 'a problem', 3, 7,
+                             'bad line of source')
+        reporter.unexpectedError('source.py', 'error message')
+        reporter.flush()
+        self.assertEqual(self.records(out), [
+            {'filename': 'foo.py', 'line': 3, 'column': 8,
+             'type': 'SyntaxError', 'message': 'a problem'},
+            {'filename': 'source.py', 'type': 'UnexpectedError',
+             'message': 'error message'}])
+
+    def test_buffering(self):
+        """
+        The lines are written once the buffer is full, or once the first one
+        waited for C{flushInterval}.
+        """
+        out = StringIO()
+        reporter = JSONLinesReporter(out, bufferSize=200, flushInterval=60)
+        reporter.flake(UnusedImport('foo.py', Node(1), 'bar'))
+        self.assertEqual(out.getvalue(), '')
+        for i in range(3):
+            reporter.flake(UnusedImport('foo.py', Node(1), 'bar'))
+        self.assertEqual(len(self.records(out)), 3)
+        reporter.flush()
+        self.assertEqual(len(self.records(out)), 4)
+
+        out = StringIO()
+        reporter = JSONLinesReporter(out, flushInterval=0)
+        reporter.flake(UnusedImport('foo.py', Node(1), 'bar'))
+        self.assertEqual(len(self.records(out)), 1)
+
+    def test_fileChecked(self):
+        """
+        The lines which waited for C{flushInterval} are written when a file
+        is checked, even if it reported nothing.
+        """
+        out = StringIO()
+        reporter = JSONLinesReporter(out, flushInterval=60)
+        reporter.flake(UnusedImport('foo.py', Node(1), 'bar'))
+        reporter.fileChecked()
+        self.assertEqual(out.getvalue(), '')
+        reporter._deadline -= 60
+        reporter.fileChecked()
+        self.assertEqual(len(self.records(out)), 1)
+
+
 class CheckTests(TestCase):
     """
     Tests for L{check} and L{checkPath} which check a file for flakes.
@@ -336,6 +490,24 @@ class CheckTests(TestCase):
         fd.close()
         return fpath
 
+    def makeTempModules(self, contents):
+        """
+        Make a temporary directory, removed after the test, of modules named
+        C{mod0.py}, C{mod1.py}, ... containing each of C{contents}.
+
+        @return: The path of the directory and the list of the paths of the
+            modules.
+        """
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        paths = []
+        for i, content in enumerate(contents):
+            path = os.path.join(tempdir, 'mod%d.py' % i)
+            with open(path, 'wb') as fd:
+                fd.write(content.encode('ascii'))
+            paths.append(path)
+        return tempdir, paths
+
     def assertHasErrors(self, path, errorList):
         """
         Assert that C{path} causes errors.
@@ -650,6 +822,111 @@ x = "%s"
                     ('flake',
                      str(UnusedImport(file2, Node(1), 'contraband')))]))
 
+    def test_checkRecursiveJobs(self):
+        """
+        L{checkRecursive} with several C{jobs} reports the same problems, in
+        the same order, as when the files are checked in a single process.
+        """
+        tempdir, _ = self.makeTempModules(
+            ["import mod%d\n" % i for i in range(20)] + ["import"])
+        serialLog = []
+        serialWarnings = checkRecursive([tempdir], LoggingReporter(serialLog))
+        log = []
+        warnings = checkRecursive([tempdir], LoggingReporter(log), jobs=3)
+        self.assertEqual(warnings, serialWarnings)
+        self.assertEqual(warnings, 21)
+        self.assertEqual(log, serialLog)
+
+    def test_checkMany(self):
+        """
+        L{checkMany} with several C{workers} reports the same problems, in
+        the same order, as when the sources are checked one after the other.
+        """
+        sources = [("import mod%d\n" % i, 'mod%d.py' % i) for i in range(20)]
+        sources.insert(5, ("import", 'broken.py'))
+        serialLog = []
+        serialWarnings = checkMany(sources, LoggingReporter(serialLog),
+                                   workers=1)
+        log = []
+        warnings = checkMany(iter(sources), LoggingReporter(log), workers=4)
+        self.assertEqual(warnings, serialWarnings)
+        self.assertEqual(warnings, 21)
+        self.assertEqual(log, serialLog)
+
+    def test_checkRecursiveReaders(self):
+        """
+        L{checkRecursive} with C{readers} reports the same problems, in the
+        same order, as when each file is read just before checking it.
+        """
+        tempdir, paths = self.makeTempModules(
+            ["import mod%d\n" % i for i in range(20)])
+        paths.insert(5, os.path.join(tempdir, 'missing.py'))
+        serialLog = []
+        serialWarnings = checkRecursive(paths, LoggingReporter(serialLog))
+        log = []
+        warnings = checkRecursive(paths, LoggingReporter(log), readers=3)
+        self.assertEqual(warnings, serialWarnings)
+        self.assertEqual(warnings, 21)
+        self.assertEqual(log, serialLog)
+
+    def test_prefetch(self):
+        """
+        L{_prefetch} yields the content of the files in order, reading no
+        more than C{readAhead} files ahead, and passes on the errors of
+        C{sources}.
+        """
+        _, paths = self.makeTempModules(
+            ["mod%d\n" % i for i in range(10)])
+        found = []
+
+        def sources():
+            for path in paths:
+                found.append(path)
+                yield path
+            raise ValueError('walk failed')
+
+        contents = _prefetch(sources(), 2, readAhead=3)
+        self.assertEqual(next(contents), (paths[0], b'mod0\n', None))
+        self.assertTrue(len(found) <= 5)
+        self.assertEqual([content for path, content, error in
+                          itertools.islice(contents, 9)],
+                         [("mod%d\n" % i).encode('ascii')
+                          for i in range(1, 10)])
+        self.assertRaises(ValueError, next, contents)
+
+    def test_checkRecursiveFileChecked(self):
+        """
+        L{checkRecursive} tells the reporter when each file is checked, with
+        or without C{jobs}.
+        """
+        _, paths = self.makeTempModules(["import mod0\n"] + [""] * 4)
+
+        class FileCheckedReporter(LoggingReporter):
+            def fileChecked(self):
+                self.log.append(('fileChecked',))
+
+        for jobs in (None, 2):
+            log = []
+            checkRecursive(paths, FileCheckedReporter(log), jobs=jobs)
+            self.assertEqual(log[0][0], 'flake')
+            self.assertEqual(log[1:], [('fileChecked',)] * 5)
+
+    def test_checkRecursiveStopOnWarning(self):
+        """
+        With C{stopOnWarning}, L{checkRecursive} stops after the first file
+        with warnings, with or without C{jobs} or C{readers}.
+        """
+        _, paths = self.makeTempModules(
+            ["import mod%d\n" % i if i in (10, 30) else "" for i in range(40)])
+        for jobs, readers in ((None, None), (3, None), (None, 2)):
+            log = []
+            warnings = checkRecursive(paths, LoggingReporter(log), jobs=jobs,
+                                      readers=readers, stopOnWarning=True)
+            self.assertEqual(warnings, 1)
+            self.assertEqual(
+                log, [('flake', str(UnusedImport(paths[10], Node(1),
+                                                 'mod10')))])
+
 
 class IntegrationTests(TestCase):
     """
@@ -723,6 +1000,59 @@ class IntegrationTests(TestCase):
         expected = UnusedImport(self.tempfilepath, Node(1), 'contraband')
         self.assertEqual(d, ("%s%s" % (expected, os.linesep), '', 1))
 
+    def test_jobs(self):
+        """
+        With C{--jobs}, the files are checked by several processes and the
+        output is the same as for a single process.
+        """
+        with open(self.tempfilepath, 'wb') as fd:
+            fd.write("import contraband\n".encode('ascii'))
+        d = self.runPyflakes(['--jobs', '2', self.tempfilepath])
+        expected = UnusedImport(self.tempfilepath, Node(1), 'contraband')
+        self.assertEqual(d, ("%s%s" % (expected, os.linesep), '', 1))
+
+    def test_cacheDir(self):
+        """
+        With C{--cache-dir}, the results are stored in the given directory and
+        a second run gives the same output.
+        """
+        with open(self.tempfilepath, 'wb') as fd:
+            fd.write("import contraband\n".encode('ascii'))
+        cachedir = os.path.join(self.tempdir, 'cache')
+        first = self.runPyflakes(['--cache-dir', cachedir, self.tempfilepath])
+        self.assertTrue(os.listdir(cachedir))
+        d = self.runPyflakes(['--cache-dir', cachedir, self.tempfilepath])
+        self.assertEqual(d, first)
+        expected = UnusedImport(self.tempfilepath, Node(1), 'contraband')
+        self.assertEqual(d, ("%s%s" % (expected, os.linesep), '', 1))
+
+    def test_formatJSONLines(self):
+        """
+        With C{--format=jsonl}, each warning is written as a JSON object.
+        """
+        with open(self.tempfilepath, 'wb') as fd:
+            fd.write("import contraband\n".encode('ascii'))
+        out, err, rv = self.runPyflakes(['--format=jsonl', self.tempfilepath])
+        self.assertEqual((err, rv), ('', 1))
+        self.assertEqual(
+            [json.loads(line) for line in out.splitlines()],
+            [{'filename': self.tempfilepath, 'line': 1, 'column': 1,
+              'type': 'UnusedImport', 'args': ['contraband']}])
+
+    def test_quiet(self):
+        """
+        With C{--quiet}, nothing is written, and the return code tells whether
+        there were warnings.
+        """
+        with open(self.tempfilepath, 'wb') as fd:
+            fd.write("import contraband\n".encode('ascii'))
+        d = self.runPyflakes(['--quiet', self.tempfilepath])
+        self.assertEqual(d, ('', '', 1))
+        with open(self.tempfilepath, 'wb') as fd:
+            fd.write("import contraband\ncontraband\n".encode('ascii'))
+        d = self.runPyflakes(['-q', self.tempfilepath])
+        self.assertEqual(d, ('', '', 0))
+
     def test_errors_io(self):
         """
         When pyflakes finds errors with the files it's given, (if they don't
@@ -0,0 +1,76 @@
+"""
+Tests for L{pyflakes.bench}.
+"""
+
+import ast
+
+from pyflakes import bench
+from pyflakes.bench.__main__ import formatRetention, formatTable, main
+from pyflakes.test.harness import TestCase, skipIf
+from pyflakes.test.test_api import SysStreamCapturing
+
+
+class TestBench(TestCase):
+    """
+    Tests for the benchmark scenarios and runner.
+    """
+
+    def test_generate(self):
+        """
+        Every scenario generates valid Python source.
+        """
+        for scenario in bench.SCENARIOS:
+            ast.parse(scenario.generate(2))
+            self.assertTrue(scenario.description)
+
+    def test_runScenario(self):
+        """
+        L{bench.runScenario} reports the size of the generated module, the
+        time taken to check it and the number of messages.
+        """
+        scenario = [s for s in bench.SCENARIOS if s.name == 'globals'][0]
+        result = bench.runScenario(scenario, scale=2, repeat=1)
+        self.assertEqual(result['scenario'], 'globals')
+        self.assertEqual(result['messages'], 22)
+        self.assertTrue(result['nodes'] > 0)
+        self.assertTrue(result['seconds'] >= 0)
+
+    def test_runAll(self):
+        """
+        L{bench.runAll} runs the named scenarios, and the results can be
+        formatted as a table.
+        """
+        report = bench.runAll(['nesting', 'star-imports'], scale=1, repeat=1)
+        self.assertEqual([r['scenario'] for r in report['results']],
+                         ['nesting', 'star-imports'])
+        table = formatTable(report).splitlines()
+        self.assertEqual(len(table), 3)
+        self.assertTrue(table[1].startswith('nesting'))
+
+    def test_badCounts(self):
+        """
+        A scale or a number of runs below 1 is a usage error.
+        """
+        for args in (['--repeat', '0'], ['--scale', '0']):
+            with SysStreamCapturing(None) as capture:
+                self.assertRaises(SystemExit, main, args)
+            self.assertIn('must be at least 1', capture.error)
+
+    @skipIf(bench.tracemalloc is None, 'tracemalloc is not available')
+    def test_runRetention(self):
+        """
+        L{bench.runRetention} measures the memory allocated while checking
+        files, which does not grow when the checkers are released.
+        """
+        released = bench.runRetention(40, release=True, samples=4)
+        kept = bench.runRetention(40, release=False, samples=4)
+        self.assertEqual(len(released['memory']), 4)
+
+        def growth(memory):
+            # The median step, as the interpreter may grow its own tables
+            # once in a while.
+            steps = sorted(b - a for a, b in zip(memory, memory[1:]))
+            return steps[len(steps) // 2]
+        self.assertTrue(growth(released['memory']) <
+                        growth(kept['memory']) // 10)
+        self.assertIn('40 files checked', formatRetention(released))
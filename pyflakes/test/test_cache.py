@@ -0,0 +1,142 @@
+"""
+Tests for L{pyflakes.cache}.
+"""
+
+import os
+import shutil
+import tempfile
+
+from pyflakes.api import checkPath
+from pyflakes.cache import ResultCache
+from pyflakes.messages import UnusedImport
+from pyflakes.test.harness import TestCase
+from pyflakes.test.test_api import LoggingReporter, Node
+
+
+class TestResultCache(TestCase):
+    """
+    Tests for L{ResultCache} used through L{checkPath}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tempdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def makeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as fd:
+            fd.write(content.encode('ascii'))
+        return path
+
+    def getErrors(self, path, cache):
+        log = []
+        count = checkPath(path, LoggingReporter(log), cache)
+        return count, log
+
+    def countEntries(self):
+        return sum(len(filenames)
+                   for _, _, filenames in os.walk(self.cachedir))
+
+    def test_hit(self):
+        """
+        A file checked a second time is reported from the cache, with the same
+        result.
+        """
+        path = self.makeFile('a.py', 'import fu\n')
+        cache = ResultCache(self.cachedir)
+        first = self.getErrors(path, cache)
+        self.assertEqual(self.countEntries(), 1)
+        self.assertEqual(self.getErrors(path, cache), first)
+        self.assertEqual(
+            first, (1, [('flake', str(UnusedImport(path, Node(1), 'fu')))]))
+
+    def test_syntaxError(self):
+        """
+        Syntax errors are cached too.
+        """
+        path = self.makeFile('a.py', 'import\n')
+        cache = ResultCache(self.cachedir)
+        first = self.getErrors(path, cache)
+        self.assertEqual(first[0], 1)
+        self.assertEqual(first[1][0][:2], ('syntaxError', path))
+        self.assertEqual(self.getErrors(path, cache), first)
+
+    def test_sameContent(self):
+        """
+        Files with the same content share an entry, reported against the name
+        of the file being checked.
+        """
+        apath = self.makeFile('a.py', 'import fu\n')
+        bpath = self.makeFile('b.py', 'import fu\n')
+        cache = ResultCache(self.cachedir)
+        self.getErrors(apath, cache)
+        self.assertEqual(
+            self.getErrors(bpath, cache),
+            (1, [('flake', str(UnusedImport(bpath, Node(1), 'fu')))]))
+        self.assertEqual(self.countEntries(), 1)
+
+    def test_changedContent(self):
+        """
+        A file is checked again once its content changed.
+        """
+        path = self.makeFile('a.py', 'import fu\n')
+        cache = ResultCache(self.cachedir)
+        self.getErrors(path, cache)
+        self.makeFile('a.py', 'import fu\nfu\n')
+        self.assertEqual(self.getErrors(path, cache), (0, []))
+        self.assertEqual(self.countEntries(), 2)
+
+    def test_configuration(self):
+        """
+        The key depends on whether doctests are checked.
+        """
+        source = 'import fu\n'.encode('ascii')
+        self.assertNotEqual(
+            ResultCache(self.cachedir).key(source, 'a.py'),
+            ResultCache(self.cachedir, withDoctest=True).key(source, 'a.py'))
+
+    def test_prune(self):
+        """
+        L{ResultCache.prune} evicts the least recently used entries until the
+        cache fits in C{maxSize}.
+        """
+        cache = ResultCache(self.cachedir)
+        keys = [cache.key(('import mod%d\n' % i).encode('ascii'), 'a.py')
+                for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.set(key, 0, [])
+            os.utime(cache._path(key), (i, i))
+        cache.get(keys[0], 'a.py')
+        size = os.path.getsize(cache._path(keys[0]))
+        cache.maxSize = 2 * size
+        cache.prune()
+        self.assertEqual(self.countEntries(), 2)
+        self.assertIsNone(cache.get(keys[1], 'a.py'))
+        self.assertEqual(cache.get(keys[0], 'a.py'), (0, []))
+
+    def test_pruneOnlyWhenGrown(self):
+        """
+        Once pruned, the cache is only walked again when the entries stored
+        since may have made it larger than C{maxSize}.
+        """
+        cache = ResultCache(self.cachedir)
+        key = cache.key('import fu\n'.encode('ascii'), 'a.py')
+        cache.set(key, 0, [])
+        size = os.path.getsize(cache._path(key))
+        cache.maxSize = 2 * size
+        cache.prune()
+        walked = []
+        self.addCleanup(setattr, os, 'walk', os.walk)
+        walk = os.walk
+        os.walk = lambda top, *args: walked.append(top) or walk(top, *args)
+        cache.prune()
+        self.assertEqual(walked, [])
+        for i in range(2):
+            cache.set(cache.key(('import mod%d\n' % i).encode('ascii'),
+                                'a.py'), 0, [])
+        cache.prune()
+        self.assertEqual(walked[:1], [self.cachedir])
+        self.assertEqual(self.countEntries(), 2)
@@ -0,0 +1,304 @@
+"""
+Tests for the internals of L{pyflakes.checker.Checker}.
+"""
+
+import ast
+import gc
+import sys
+import weakref
+
+from pyflakes import checker, messages
+from pyflakes.profiler import Profiler
+from pyflakes.test.harness import TestCase, skipIf
+
+
+class KeepingChecker(checker.Checker):
+    """
+    A checker keeping the parents of the nodes after the check.
+    """
+
+    def checkDeadScopes(self):
+        self.parents = self._parents
+        checker.Checker.checkDeadScopes(self)
+
+
+class TestAncestors(TestCase):
+    """
+    Tests for the ancestor queries used to tell apart the forks of IF/TRY.
+    """
+
+    def makeChecker(self):
+        w = checker.Checker(ast.Module(body=[]))
+        w._parents = {}
+        return w
+
+    def makeChain(self, w, root, length):
+        """
+        Make a chain of C{length} nodes below C{root}, and return the last.
+        """
+        node = root
+        for i in range(length):
+            child = ast.Expr()
+            w._parents[child] = node
+            node = child
+        return node
+
+    def test_deepCommonAncestor(self):
+        """
+        The common ancestor of nodes deeper than the recursion limit is found.
+        """
+        w = self.makeChecker()
+        root = ast.Module(body=[])
+        fork = self.makeChain(w, root, 10)
+        depth = sys.getrecursionlimit() * 2
+        left = self.makeChain(w, fork, depth)
+        right = self.makeChain(w, fork, depth + 1)
+        self.assertIs(w.getCommonAncestor(left, right, root), fork)
+        self.assertIsNone(w.getCommonAncestor(left, right, fork))
+
+    def test_descendantOf(self):
+        """
+        L{Checker.descendantOf} tells whether a node is below one of the given
+        nodes, without going past C{stop}.
+        """
+        w = self.makeChecker()
+        root = ast.Module(body=[])
+        a = self.makeChain(w, root, 1)
+        b = self.makeChain(w, root, 1)
+        leaf = self.makeChain(w, a, 3)
+        self.assertTrue(w.descendantOf(leaf, [b, a], root))
+        self.assertFalse(w.descendantOf(leaf, [b], root))
+        self.assertFalse(w.descendantOf(leaf, [a], a))
+
+
+class TestTraversal(TestCase):
+    """
+    Tests for the traversal of the tree by L{Checker.handleNode}.
+    """
+
+    def test_deepExpression(self):
+        """
+        Expressions nested deeper than the recursion limit are checked.
+        """
+        terms = ['a'] * sys.getrecursionlimit()
+        terms[0] = 'b'
+        tree = ast.parse('def f(a):\n    return %s\n' % ' + '.join(terms))
+        w = KeepingChecker(tree)
+        self.assertEqual([str(m) for m in w.messages],
+                         ["(none):2: undefined name 'b'"])
+        leaf = tree.body[0].body[0].value
+        while isinstance(leaf, ast.BinOp):
+            leaf = leaf.left
+        depth = 0
+        while leaf in w.parents:
+            leaf = w.parents[leaf]
+            depth += 1
+        self.assertIs(leaf, tree)
+        self.assertEqual(depth, len(terms) + 2)
+        self.assertEqual(w.nodeDepth, 0)
+
+    def test_nodesUnchanged(self):
+        """
+        The parents of the nodes are not set on the nodes, and are released
+        after the check.
+        """
+        tree = ast.parse('def f(a):\n    return [b for b in a]\n')
+        w = KeepingChecker(tree)
+        self.assertIs(w.parents[tree.body[0]], tree)
+        for node in ast.walk(tree):
+            self.assertFalse(hasattr(node, 'parent'))
+            self.assertFalse(hasattr(node, 'depth'))
+        self.assertIsNone(w._parents)
+
+    def test_order(self):
+        """
+        Nodes are visited in the order of L{checker._FieldsOrder}, with the
+        parent set before the children.
+        """
+        tree = ast.parse('[x for x in y if x]')
+        seen = []
+
+        class RecordingChecker(checker.Checker):
+            def NAME(self, node):
+                seen.append((node.id,
+                             self._parents[node].__class__.__name__))
+                checker.Checker.NAME(self, node)
+
+        RecordingChecker(tree)
+        self.assertEqual(seen, [('y', 'comprehension'),
+                                ('x', 'comprehension'),
+                                ('x', 'comprehension'),
+                                ('x', 'ListComp')])
+
+
+class TestChildNodes(TestCase):
+    """
+    Tests for L{checker.iter_child_nodes}.
+    """
+
+    def children(self, source, omit=None):
+        node = ast.parse(source).body[0]
+        return [child.__class__.__name__ if child else child
+                for child in checker.iter_child_nodes(node, omit)]
+
+    def test_order(self):
+        """
+        The iterator comes before the target, and generators before the
+        element.
+        """
+        self.assertEqual(self.children('for a in b: pass'),
+                         ['Name', 'Name', 'Pass'])
+        tree = ast.parse('for a in b: pass').body[0]
+        self.assertIs(next(checker.iter_child_nodes(tree)), tree.iter)
+
+    def test_scalarFields(self):
+        """
+        Fields which do not hold nodes are skipped, and learnt as such.
+        """
+        self.assertEqual(self.children('global a, b'), [])
+        fields = dict(checker._fields_order[ast.Global])
+        self.assertEqual(fields['names'], checker._SCALAR)
+        node = ast.parse('a.b').body[0].value
+        self.assertEqual(list(checker.iter_child_nodes(node)), [node.value])
+        fields = dict(checker._fields_order[ast.Attribute])
+        self.assertEqual(fields['attr'], checker._SCALAR)
+        self.assertEqual(fields['value'], checker._NODE)
+
+    def test_leaves(self):
+        """
+        Expression contexts and operators are not child nodes.
+        """
+        tree = ast.parse('not a < b and c')
+        w = KeepingChecker(tree)
+        node = tree.body[0].value
+        self.assertEqual(list(checker.iter_child_nodes(node)), node.values)
+        compare = node.values[0].operand
+        self.assertEqual(list(checker.iter_child_nodes(compare)),
+                         [compare.left] + compare.comparators)
+        self.assertIn(compare.left, w.parents)
+        self.assertNotIn(compare.left.ctx, w.parents)
+
+    def test_optionalFields(self):
+        """
+        Missing optional nodes are skipped.
+        """
+        self.assertEqual(self.children('return'), [])
+        self.assertEqual(self.children('return a'), ['Name'])
+
+    @skipIf(sys.version_info < (3, 5), 'new in Python 3.5')
+    def test_noneItems(self):
+        """
+        The C{None} items of lists of nodes are kept.
+        """
+        node = ast.parse('{**a, b: c}').body[0].value
+        self.assertEqual(list(checker.iter_child_nodes(node)),
+                         [None, node.keys[1]] + node.values)
+
+    def test_omit(self):
+        """
+        The fields in C{omit} are skipped.
+        """
+        self.assertEqual(self.children('@d\ndef f(): pass',
+                                       omit='decorator_list'),
+                         ['arguments', 'Pass'])
+
+
+class TestSlots(TestCase):
+    """
+    Bindings and messages are slotted, to save memory.
+    """
+
+    def assertSlotted(self, base, module):
+        for name in dir(module):
+            cls = getattr(module, name)
+            if isinstance(cls, type) and issubclass(cls, base):
+                self.assertIn('__slots__', cls.__dict__, name)
+
+    def test_bindings(self):
+        self.assertSlotted(checker.Binding, checker)
+        binding = checker.ImportationFrom('a', None, 'm')
+        self.assertFalse(hasattr(binding, '__dict__'))
+        self.assertEqual(binding.fullName, 'm.a')
+
+    def test_messages(self):
+        self.assertSlotted(messages.Message, messages)
+        tree = ast.parse('import os')
+        w = checker.Checker(tree)
+        self.assertFalse(hasattr(w.messages[0], '__dict__'))
+        self.assertEqual(w.messages[0].message_args, ('os',))
+
+
+class TestThreads(TestCase):
+    """
+    Checkers can run at the same time in several threads.
+    """
+
+    def test_concurrentCheckers(self):
+        """
+        Checkers running in a thread pool, each on its own tree, report the
+        same messages as when run one after the other, including those of the
+        doctests, which use the C{_} builtin of the doctest scope.
+        """
+        from multiprocessing.pool import ThreadPool
+        sources = ['import os%d\n'
+                   'def f(a):\n'
+                   '    """\n'
+                   '    >>> f(%d)\n'
+                   '    >>> _ + c%d\n'
+                   '    """\n'
+                   '    return b%d + a\n' % (i, i, i, i)
+                   for i in range(40)]
+
+        def run(source):
+            w = checker.Checker(ast.parse(source), withDoctest=True)
+            return [str(message) for message in w.messages]
+
+        expected = [run(source) for source in sources]
+        pool = ThreadPool(8)
+        try:
+            self.assertEqual(pool.map(run, sources, 1), expected)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertNotIn('_', checker.Checker.builtIns)
+        self.assertEqual(checker.Checker.nodeDepth, 0)
+        self.assertIsNone(checker.Checker.offset)
+
+
+class TestRelease(TestCase):
+    """
+    Tests for L{checker.Checker.release}.
+    """
+
+    def test_result(self):
+        """
+        The result holds the messages of the check.
+        """
+        w = checker.Checker(ast.parse('import os'), 'a.py')
+        messages = w.messages
+        result = w.release()
+        self.assertIsInstance(result, checker.CheckResult)
+        self.assertEqual(result.filename, 'a.py')
+        self.assertIs(result.messages, messages)
+        self.assertIsNone(w.deadScopes)
+        self.assertIsNone(w.root)
+
+    def test_freed(self):
+        """
+        Once the checker is released, its tree is freed without the garbage
+        collector.
+        """
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            tree = ast.parse('import os\ndef f(a):\n    return a, b\n')
+            w = checker.Checker(tree, profiler=Profiler())
+            function = weakref.ref(tree.body[1])
+            del tree
+            self.assertIsNotNone(function())
+            w.release()
+            del w
+            self.assertIsNone(function())
+        finally:
+            if enabled:
+                gc.enable()
@@ -0,0 +1,267 @@
+"""
+Tests for L{pyflakes.daemon}.
+"""
+
+import errno
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from pyflakes import daemon
+from pyflakes.api import main
+from pyflakes.cache import ResultCache
+from pyflakes.messages import UnusedImport
+from pyflakes.test.harness import TestCase, skipIf
+from pyflakes.test.test_api import Node, SysStreamCapturing
+
+
+@skipIf(not hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+class TestDaemon(TestCase):
+    """
+    Tests for the pyflakes server and client.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tempdir, 'sock')
+        self.path = os.path.join(self.tempdir, 'a.py')
+        with open(self.path, 'wb') as fd:
+            fd.write("import contraband\n".encode('ascii'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def startServer(self, walkOptions=None, cache=None):
+        server = daemon.makeServer(self.address, cache, walkOptions)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            server.server_close()
+        self.addCleanup(stop)
+
+    def runClient(self, args, stdin=None):
+        try:
+            with SysStreamCapturing(stdin) as capture:
+                daemon.main(['--socket', self.address] + args)
+        except SystemExit as e:
+            return (capture.output, capture.error, e.code)
+        else:
+            raise RuntimeError('SystemExit not raised')
+
+    def test_paths(self):
+        """
+        The server checks the paths sent by the client.
+        """
+        self.startServer()
+        response = daemon.request({'cwd': self.tempdir, 'paths': [self.path]},
+                                  self.address)
+        expected = UnusedImport(self.path, Node(1), 'contraband')
+        self.assertEqual(response, {'stdout': '%s\n' % (expected,),
+                                    'stderr': '', 'warnings': 1})
+
+    def test_relativePaths(self):
+        """
+        Relative paths are checked from the working directory of the client
+        and reported as given.
+        """
+        self.startServer()
+        response = daemon.request({'cwd': self.tempdir, 'paths': ['.']},
+                                  self.address)
+        expected = UnusedImport(os.path.join('.', 'a.py'), Node(1),
+                                'contraband')
+        self.assertEqual(response['stdout'], '%s\n' % (expected,))
+
+    def test_walkOptions(self):
+        """
+        The files in the requested paths are found with the options the
+        server was started with.
+        """
+        with open(os.path.join(self.tempdir, 'test_a.py'), 'wb') as fd:
+            fd.write("import fu\n".encode('ascii'))
+        self.startServer({'exclude': ['test_*']})
+        response = daemon.request({'cwd': self.tempdir, 'paths': ['.']},
+                                  self.address)
+        expected = UnusedImport(os.path.join('.', 'a.py'), Node(1),
+                                'contraband')
+        self.assertEqual(response['stdout'], '%s\n' % (expected,))
+
+    def test_cachePruned(self):
+        """
+        The cache of the server is pruned after each request to check paths.
+        """
+        cache = ResultCache(os.path.join(self.tempdir, 'cache'), maxSize=0)
+        self.startServer(cache=cache)
+        response = daemon.request({'cwd': self.tempdir, 'paths': [self.path]},
+                                  self.address)
+        self.assertEqual(response['warnings'], 1)
+        self.assertEqual([filenames for dirpath, dirnames, filenames
+                          in os.walk(cache.directory) if filenames], [])
+
+    def test_source(self):
+        """
+        The server checks source text sent by the client.
+        """
+        self.startServer()
+        response = daemon.request({'source': 'import fu\n',
+                                   'filename': '<stdin>'}, self.address)
+        expected = UnusedImport('<stdin>', Node(1), 'fu')
+        self.assertEqual(response['stdout'], '%s\n' % (expected,))
+        self.assertEqual(response['warnings'], 1)
+
+    def test_client(self):
+        """
+        The client prints the output of the server and exits with an error
+        status if there are warnings.
+        """
+        self.startServer()
+        expected = UnusedImport(self.path, Node(1), 'contraband')
+        self.assertEqual(self.runClient([self.path]),
+                         ('%s%s' % (expected, os.linesep), '', 1))
+
+    def test_clientOptions(self):
+        """
+        The client rejects the options of pyflakes, which the server is
+        started with.
+        """
+        out, err, rv = self.runClient(['--exclude', 'test_*', self.path])
+        self.assertEqual((out, rv), ('', 2))
+        self.assertIn('unknown option --exclude', err)
+
+    def test_otherUser(self):
+        """
+        The client does not use a socket which belongs to another user, and
+        checks the files itself.
+        """
+        self.startServer()
+        uid = os.getuid()
+        self.addCleanup(setattr, os, 'getuid', os.getuid)
+        os.getuid = lambda: uid + 1
+        self.assertRaises(socket.error, daemon.request,
+                          {'cwd': self.tempdir, 'paths': [self.path]},
+                          self.address)
+        expected = UnusedImport(self.path, Node(1), 'contraband')
+        self.assertEqual(self.runClient([self.path]),
+                         ('%s%s' % (expected, os.linesep), '', 1))
+
+    def test_staleSocket(self):
+        """
+        A socket nobody listens on is replaced.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.address)
+        sock.close()
+        self.startServer()
+        response = daemon.request({'cwd': self.tempdir, 'paths': [self.path]},
+                                  self.address)
+        self.assertEqual(response['warnings'], 1)
+
+    def test_otherUserServer(self):
+        """
+        The socket of another user is not replaced.
+        """
+        self.startServer()
+        uid = os.getuid()
+        self.addCleanup(setattr, os, 'getuid', os.getuid)
+        os.getuid = lambda: uid + 1
+        with self.assertRaises(socket.error) as cm:
+            daemon.makeServer(self.address)
+        self.assertEqual(cm.exception.errno, errno.EPERM)
+        self.assertTrue(os.path.exists(self.address))
+
+    def test_defaultAddress(self):
+        """
+        The default socket is in C{$XDG_RUNTIME_DIR}, or else in a directory
+        of the temporary directory named after the user.
+        """
+        environ = dict(os.environ)
+        self.addCleanup(os.environ.update, environ)
+        self.addCleanup(os.environ.clear)
+        os.environ.pop('PYFLAKES_SOCKET', None)
+        os.environ['XDG_RUNTIME_DIR'] = self.tempdir
+        self.assertEqual(daemon.defaultAddress(),
+                         os.path.join(self.tempdir, 'pyflakes.sock'))
+        del os.environ['XDG_RUNTIME_DIR']
+        self.addCleanup(setattr, tempfile, 'tempdir', tempfile.tempdir)
+        tempfile.tempdir = self.tempdir
+        self.assertEqual(daemon.defaultAddress(),
+                         os.path.join(self.tempdir,
+                                      'pyflakes-%d' % os.getuid(), 'sock'))
+
+    def test_environmentAddress(self):
+        """
+        The socket given by C{$PYFLAKES_SOCKET} may be in a directory others
+        can access, as with C{--socket}.
+        """
+        directory = os.path.join(self.tempdir, 'shared')
+        os.mkdir(directory)
+        os.chmod(directory, 0o755)
+        environ = dict(os.environ)
+        self.addCleanup(os.environ.update, environ)
+        self.addCleanup(os.environ.clear)
+        os.environ['PYFLAKES_SOCKET'] = self.address = os.path.join(
+            directory, 'sock')
+        servers = []
+        makeServer = daemon.makeServer
+        self.addCleanup(setattr, daemon, 'makeServer', makeServer)
+        daemon.makeServer = lambda *args: (servers.append(makeServer(*args))
+                                           or servers[-1])
+        thread = threading.Thread(target=daemon.serve)
+        thread.start()
+        try:
+            for i in range(100):
+                if servers:
+                    break
+                time.sleep(0.05)
+            response = daemon.request(
+                {'cwd': self.tempdir, 'paths': [self.path]})
+            self.assertEqual(response['warnings'], 1)
+        finally:
+            if servers:
+                servers[0].shutdown()
+            thread.join()
+        self.assertFalse(os.path.exists(self.address))
+
+    def test_privateDirectory(self):
+        """
+        The directory of the default socket is created with access for the
+        user only, and is not used if others can access it.
+        """
+        path = os.path.join(self.tempdir, 'private')
+        daemon._makePrivateDirectory(path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+        daemon._makePrivateDirectory(path)
+        os.chmod(path, 0o777)
+        self.assertRaises(OSError, daemon._makePrivateDirectory, path)
+
+    def test_unavailable(self):
+        """
+        Without Unix domain sockets or user ids, the client checks the files
+        itself and the server cannot be started.
+        """
+        self.startServer()
+        self.addCleanup(setattr, daemon, '_AVAILABLE', daemon._AVAILABLE)
+        daemon._AVAILABLE = False
+        self.assertRaises(socket.error, daemon.request,
+                          {'cwd': self.tempdir, 'paths': [self.path]},
+                          self.address)
+        expected = UnusedImport(self.path, Node(1), 'contraband')
+        self.assertEqual(self.runClient([self.path]),
+                         ('%s%s' % (expected, os.linesep), '', 1))
+        with SysStreamCapturing(None) as capture:
+            self.assertRaises(SystemExit, main, args=['--daemon'])
+        self.assertIn('--daemon: ', capture.error)
+        self.assertIn('Unix domain sockets are not available', capture.error)
+
+    def test_clientWithoutServer(self):
+        """
+        Without a server, the client checks the files itself.
+        """
+        expected = UnusedImport(self.path, Node(1), 'contraband')
+        self.assertEqual(self.runClient([self.path]),
+                         ('%s%s' % (expected, os.linesep), '', 1))
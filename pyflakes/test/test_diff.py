@@ -0,0 +1,179 @@
+"""
+Tests for L{pyflakes.diff}.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from pyflakes import diff
+from pyflakes.api import main
+from pyflakes.messages import UnusedImport
+from pyflakes.test.harness import TestCase, skipIf
+from pyflakes.test.test_api import LoggingReporter, Node, SysStreamCapturing
+
+
+def _hasGit():
+    try:
+        subprocess.call(['git', '--version'], stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE)
+    except OSError:
+        return False
+    return True
+
+
+@skipIf(not _hasGit(), 'git is not available')
+class TestDiff(TestCase):
+    """
+    Tests for L{diff.changedLines} and the C{--diff} option.
+    """
+
+    def setUp(self):
+        self.tempdir = os.path.realpath(tempfile.mkdtemp())
+        self.cwd = os.getcwd()
+        os.chdir(self.tempdir)
+        self.git('init', '-q')
+        self.git('config', 'user.email', 'test@example.com')
+        self.git('config', 'user.name', 'Test')
+        self.writeFile('a.py', 'import os\nimport sys\n')
+        self.writeFile('b.py', 'import os\n')
+        self.writeFile('gone.py', 'import os\n')
+        self.writeFile('README', 'import os\n')
+        self.git('add', '.')
+        self.git('commit', '-q', '-m', 'initial')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tempdir)
+
+    def git(self, *args):
+        subprocess.check_call(('git',) + args, stdout=subprocess.PIPE)
+
+    def writeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as fd:
+            fd.write(content.encode('ascii'))
+
+    def change(self):
+        self.writeFile('a.py', 'import os\nimport re\nimport sys\nre\n')
+        self.writeFile('README', 'import sys\n')
+        self.writeFile(os.path.join('pkg', 'new.py'), 'import json\n')
+        os.remove('gone.py')
+
+    def runPyflakes(self, args):
+        try:
+            with SysStreamCapturing(None) as capture:
+                main(args=args)
+        except SystemExit as e:
+            return capture.output, capture.error, e.code
+        raise RuntimeError('SystemExit not raised')
+
+    def test_changedLines(self):
+        """
+        The changed lines of modified files are listed, untracked files are
+        listed as a whole and deleted files are left out.
+        """
+        self.change()
+        self.assertEqual(diff.changedLines('HEAD'), {
+            'a.py': [(2, 2), (4, 4)],
+            'README': [(1, 1)],
+            os.path.join('pkg', 'new.py'): None,
+        })
+
+    def test_subdirectory(self):
+        """
+        The paths are relative to the current directory.
+        """
+        self.change()
+        self.writeFile('u.py', 'import os\n')
+        lines = diff.changedLines('HEAD', os.path.join(self.tempdir, 'pkg'))
+        self.assertEqual(sorted(lines),
+                         [os.path.join('..', 'README'),
+                          os.path.join('..', 'a.py'),
+                          os.path.join('..', 'u.py'), 'new.py'])
+
+    def test_noPrefix(self):
+        """
+        The changed lines are found whatever the diff prefixes configured.
+        """
+        self.change()
+        for option in ['diff.noprefix', 'diff.mnemonicPrefix']:
+            self.git('config', option, 'true')
+            self.assertEqual(diff.changedLines('HEAD')['a.py'],
+                             [(2, 2), (4, 4)])
+            self.git('config', '--unset', option)
+
+    def test_changedSourceFiles(self):
+        """
+        Only Python files are selected, below the given paths.
+        """
+        self.change()
+        lines = diff.changedLines('HEAD')
+        self.assertEqual(diff.changedSourceFiles(lines),
+                         ['a.py', os.path.join('pkg', 'new.py')])
+        self.assertEqual(diff.changedSourceFiles(lines, ['pkg']),
+                         [os.path.join('pkg', 'new.py')])
+
+    def test_lineFilteringReporter(self):
+        """
+        L{diff.LineFilteringReporter} passes on the warnings of changed lines
+        and of untracked files.
+        """
+        log = []
+        reporter = diff.LineFilteringReporter(
+            LoggingReporter(log), {'a.py': [(2, 3)], 'new.py': None})
+        for path, lineno in [('a.py', 1), ('a.py', 3), ('new.py', 7),
+                             ('b.py', 1)]:
+            reporter.flake(UnusedImport(path, Node(lineno), 'os'))
+        self.assertEqual(reporter.warnings, 2)
+        self.assertEqual(log, [
+            ('flake', str(UnusedImport('a.py', Node(3), 'os'))),
+            ('flake', str(UnusedImport('new.py', Node(7), 'os')))])
+
+    def test_main(self):
+        """
+        With C{--diff}, only the changed files are checked; with
+        C{--diff-lines}, only the warnings of changed lines are reported.
+        """
+        self.change()
+        newPath = os.path.join('pkg', 'new.py')
+        out, err, rv = self.runPyflakes(['--diff', 'HEAD'])
+        self.assertEqual(out.splitlines(), [
+            str(UnusedImport('a.py', Node(1), 'os')),
+            str(UnusedImport('a.py', Node(3), 'sys')),
+            str(UnusedImport(newPath, Node(1), 'json'))])
+        self.assertEqual((err, rv), ('', 1))
+        out, err, rv = self.runPyflakes(['--diff', 'HEAD', '--diff-lines'])
+        self.assertEqual(out.splitlines(), [
+            str(UnusedImport(newPath, Node(1), 'json'))])
+        os.remove(newPath)
+        self.assertEqual(self.runPyflakes(['--diff', 'HEAD', '--diff-lines']),
+                         ('', '', 0))
+
+    def test_ignoredPaths(self):
+        """
+        L{diff.ignoredPaths} lists the files and directories git ignores, and
+        the C{--gitignore} option skips them.
+        """
+        self.writeFile('.gitignore', 'generated/\nlocal.py\n')
+        self.writeFile(os.path.join('generated', 'g.py'), 'import os\n')
+        self.writeFile('local.py', 'import os\n')
+        self.assertEqual(diff.ignoredPaths('.'), set([
+            os.path.join('.', 'generated'), os.path.join('.', 'local.py')]))
+        out, err, rv = self.runPyflakes(['--gitignore', '.'])
+        self.assertEqual(sorted(out.splitlines()), [
+            str(UnusedImport(os.path.join('.', path), Node(lineno), name))
+            for path, lineno, name in [('a.py', 1, 'os'), ('a.py', 2, 'sys'),
+                                       ('b.py', 1, 'os'),
+                                       ('gone.py', 1, 'os')]])
+
+    def test_badRef(self):
+        """
+        An unknown revision is a usage error.
+        """
+        out, err, rv = self.runPyflakes(['--diff', 'no-such-ref'])
+        self.assertEqual(rv, 2)
+        self.assertIn('--diff:', err)
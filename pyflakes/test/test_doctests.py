@@ -1,16 +1,20 @@
+import ast
 import sys
 import textwrap
 
+from pyflakes import checker as mod_checker
 from pyflakes import messages as m
 from pyflakes.checker import (
+    Checker,
     DoctestScope,
     FunctionScope,
     ModuleScope,
+    _DoctestCache,
 )
 from pyflakes.test.test_other import Test as TestOther
 from pyflakes.test.test_imports import Test as TestImports
 from pyflakes.test.test_undefined_names import Test as TestUndefinedNames
-from pyflakes.test.harness import TestCase, skip
+from pyflakes.test.harness import TestCase, skip, PyCF_ONLY_AST
 
 try:
     sys.pypy_version_info
@@ -94,6 +98,55 @@ class Test(TestCase):
         self.assertEqual(len(function_scopes), 1)
         self.assertIn('f', function_scopes[0])
 
+    def test_cachedExamples(self):
+        """
+        The examples of a docstring are parsed once, and each check gets new
+        trees for them.
+        """
+        checker = Checker(compile('', '<test>', 'exec', PyCF_ONLY_AST),
+                          withDoctest=True)
+        docstring = '\n>>> a = b\n>>> a +\n'
+        mod_checker._doctestCache.clear()
+        parsed = []
+        checker._getDoctestExamples = lambda docstring: parsed.append(
+            docstring) or Checker._getDoctestExamples(docstring)
+        first = checker._getDoctests(docstring)
+        second = checker._getDoctests(docstring)
+        self.assertEqual(parsed, [docstring])
+        self.assertEqual([example for example, tree in first],
+                         [example for example, tree in second])
+        self.assertEqual(first[0][0][:3], ('a = b\n', 1, 0))
+        self.assertIsNotNone(first[1][0][3])
+        self.assertIsNone(first[1][1])
+        self.assertIsNot(first[0][1], second[0][1])
+
+    def test_underscoreScopeBuiltin(self):
+        """
+        C{_} is a builtin of the doctest scopes, not of the builtins shared by
+        all the checkers.
+        """
+        checker = Checker(compile('', '<test>', 'exec', PyCF_ONLY_AST),
+                          withDoctest=True)
+        checker.pushScope(DoctestScope)
+        checker.handleNodeLoad(
+            ast.Name(id='_', ctx=ast.Load(), lineno=1, col_offset=0))
+        self.assertEqual(checker.messages, [])
+        self.assertNotIn('_', Checker.builtIns)
+        self.assertNotIn('_', ModuleScope.builtIns)
+
+    def test_doctestCacheSize(self):
+        """
+        L{_DoctestCache} drops the least recently used entries.
+        """
+        cache = _DoctestCache(size=2)
+        cache.set('a', ())
+        cache.set('b', ())
+        cache.get('a')
+        cache.set('c', ())
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), ())
+        self.assertEqual(cache.get('c'), ())
+
     def test_nested_doctest_ignored(self):
         """Check that nested doctests are ignored."""
         checker = self.flakes("""
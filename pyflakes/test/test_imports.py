@@ -825,6 +825,21 @@ class Test(TestCase):
             x
         ''', m.ImportStarUsed, m.ImportStarUsed, m.ImportStarUsage)
 
+    def test_importStarUsageSources(self):
+        """
+        A name which may come from star imports lists each module once.
+        """
+        checker = self.flakes('''
+        from fu import *
+        from bar import *
+        from fu import *
+        def f():
+            x
+        ''', m.ImportStarUsed, m.ImportStarUsed, m.ImportStarUsed,
+                              m.RedefinedWhileUnused, m.ImportStarUsage)
+        error = checker.messages[-1]
+        assert error.message_args == ('x', 'bar, fu')
+
     def test_packageImport(self):
         """
         If a dotted name is imported and used, no warning is reported.
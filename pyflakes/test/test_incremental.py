@@ -0,0 +1,239 @@
+"""
+Tests for L{pyflakes.incremental}.
+"""
+
+import textwrap
+
+from pyflakes import checker
+from pyflakes.incremental import IncrementalChecker
+from pyflakes.test.harness import TestCase, PyCF_ONLY_AST
+
+
+def parse(source):
+    return compile(textwrap.dedent(source), "<test>", "exec", PyCF_ONLY_AST)
+
+
+class TestIncrementalChecker(TestCase):
+    """
+    Tests for L{IncrementalChecker}.
+    """
+
+    def recheck(self, old, new, reused):
+        """
+        Check C{new} after C{old} and assert that the messages are those of a
+        full check, and that C{reused} definitions were reused.
+        """
+        previous = IncrementalChecker(parse(old))
+        previous.release()
+        w = IncrementalChecker(parse(new), previous=previous)
+        full = checker.Checker(parse(new))
+        self.assertEqual(
+            sorted((m.lineno, str(m)) for m in w.messages),
+            sorted((m.lineno, str(m)) for m in full.messages))
+        self.assertEqual(w.reusedDefinitions, reused)
+        return w
+
+    def test_unchanged(self):
+        """
+        All definitions of an unchanged module are reused.
+        """
+        source = '''
+        import os, sys
+        def f():
+            os
+        class C:
+            def g(self):
+                a = sys
+        '''
+        w = self.recheck(source, source, 2)
+        self.assertEqual(len(w.messages), 1)
+
+    def test_changedFunction(self):
+        """
+        Only the changed function is checked again; the module bindings used
+        by the others remain used.
+        """
+        self.recheck('''
+        import os, sys
+        def f():
+            os
+        def g():
+            a = sys
+        ''', '''
+        import os, sys
+        def f():
+            os
+        def g():
+            b = sys
+        ''', 1)
+
+    def test_changedUsage(self):
+        """
+        An import no longer used by the changed function is reported.
+        """
+        w = self.recheck('''
+        import os, sys
+        def f():
+            os
+        def g():
+            sys
+        ''', '''
+        import os, sys
+        def f():
+            os
+        def g():
+            os
+        ''', 1)
+        self.assertEqual([str(m) for m in w.messages],
+                         ["(none):2: 'sys' imported but unused"])
+
+    def test_localScopes(self):
+        """
+        Messages about the scopes of a reused function are replayed.
+        """
+        w = self.recheck('''
+        def f():
+            import os
+            def g():
+                import sys
+        def h():
+            pass
+        ''', '''
+        def f():
+            import os
+            def g():
+                import sys
+        def h():
+            h
+        ''', 1)
+        self.assertEqual(len(w.messages), 2)
+
+    def test_changedModuleScope(self):
+        """
+        When the module scope changes, everything is checked again.
+        """
+        self.recheck('''
+        import os
+        def f():
+            os
+        ''', '''
+        import sys
+        def f():
+            os
+        ''', 0)
+
+    def test_global(self):
+        """
+        When a function declares a global, everything is checked again.
+        """
+        self.recheck('''
+        def f():
+            a
+        def g():
+            pass
+        ''', '''
+        def f():
+            a
+        def g():
+            global a
+        ''', 0)
+
+    def test_movedFunction(self):
+        """
+        A function which only moved is reused, with its messages moved along.
+        """
+        w = self.recheck('''
+        import os
+        def f():
+            os
+            a
+        ''', '''
+        import os
+
+        def f():
+            os
+            a
+        ''', 1)
+        self.assertEqual([str(m) for m in w.messages],
+                         ["(none):6: undefined name 'a'"])
+
+    def test_insertedLine(self):
+        """
+        A line inserted in a function does not prevent the reuse of the
+        definitions below it.
+        """
+        w = self.recheck('''
+        import os
+        def f():
+            pass
+        def g():
+            @os.decorator
+            def h():
+                b
+        ''', '''
+        import os
+        def f():
+            a = 1
+            return a
+        def g():
+            @os.decorator
+            def h():
+                b
+        ''', 1)
+        self.assertEqual([str(m) for m in w.messages],
+                         ["(none):9: undefined name 'b'"])
+
+    def test_citedLines(self):
+        """
+        A definition whose messages cite the line of another node is checked
+        again, as that node may have moved.
+        """
+        self.recheck('''
+        def f():
+            x
+            x = 2
+        x = 1
+        ''', '''
+        def f():
+            x
+            x = 2
+
+        x = 1
+        ''', 0)
+
+    def test_chained(self):
+        """
+        Results reused by one check are available to the next.
+        """
+        first = IncrementalChecker(parse('''
+        import os
+        def f():
+            os
+        def g():
+            pass
+        '''))
+        second = IncrementalChecker(parse('''
+        import os
+        def f():
+            os
+        def g():
+            g
+        '''), previous=first)
+        third = IncrementalChecker(parse('''
+        import os
+        def f():
+            os
+        def g():
+            f
+        '''), previous=second)
+        self.assertEqual(third.reusedDefinitions, 1)
+        self.assertEqual(third.messages, [])
+
+    def test_deepDefinition(self):
+        """
+        A module with a definition too deep to be compared is fully checked.
+        """
+        source = ('import os\ndef f(a):\n    return %s\ndef g():\n    os\n'
+                  % (' + '.join(['a'] * 1000),))
+        w = self.recheck(source, source, 0)
+        self.assertEqual(w.messages, [])
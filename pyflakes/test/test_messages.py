@@ -0,0 +1,60 @@
+"""
+Tests for L{pyflakes.messages}.
+"""
+
+import pickle
+
+from pyflakes import messages as m
+from pyflakes.test.harness import TestCase
+
+
+class Node(object):
+    def __init__(self, lineno, col_offset=0):
+        self.lineno = lineno
+        self.col_offset = col_offset
+
+
+class TestMessageRecords(TestCase):
+    """
+    Tests for L{m.MessageRecords}.
+    """
+
+    def makeRecords(self):
+        records = m.MessageRecords('a.py')
+        records.append(m.UnusedImport('a.py', Node(1), 'os'))
+        records.append(m.UndefinedName('a.py', Node(2, 4), 'b'))
+        records.append(m.UnusedImport('a.py', Node(3), 'sys'))
+        return records
+
+    def test_iterate(self):
+        """
+        Iterating gives back equivalent messages.
+        """
+        records = self.makeRecords()
+        self.assertEqual(len(records), 3)
+        self.assertEqual([str(message) for message in records], [
+            "a.py:1: 'os' imported but unused",
+            "a.py:2: undefined name 'b'",
+            "a.py:3: 'sys' imported but unused"])
+        message = list(records)[1]
+        self.assertIsInstance(message, m.UndefinedName)
+        self.assertEqual((message.lineno, message.col, message.message_args),
+                         (2, 4, ('b',)))
+
+    def test_withFilename(self):
+        """
+        L{m.MessageRecords.withFilename} reports the same messages against
+        another file.
+        """
+        records = self.makeRecords().withFilename('b.py')
+        self.assertEqual([message.filename for message in records],
+                         ['b.py'] * 3)
+
+    def test_pickle(self):
+        """
+        Records can be pickled.
+        """
+        records = self.makeRecords()
+        copy = pickle.loads(pickle.dumps(records, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual([str(message) for message in copy],
+                         [str(message) for message in records])
@@ -0,0 +1,85 @@
+"""
+Tests for L{pyflakes.profiler}.
+"""
+
+import ast
+import textwrap
+
+from pyflakes import checker
+from pyflakes.profiler import Profiler
+from pyflakes.test.harness import TestCase, PyCF_ONLY_AST
+
+
+class TestProfiler(TestCase):
+    """
+    Tests for L{Profiler}.
+    """
+
+    def check(self, source, **kw):
+        profiler = Profiler()
+        tree = compile(textwrap.dedent(source), "<test>", "exec",
+                       PyCF_ONLY_AST)
+        checker.Checker(tree, profiler=profiler, **kw)
+        return profiler
+
+    def test_handlers(self):
+        """
+        The calls of each node handler are counted.
+        """
+        profiler = self.check('''
+        import os
+        def f():
+            return os, os
+        ''')
+        self.assertEqual(profiler.handlers['IMPORT'][0], 1)
+        self.assertEqual(profiler.handlers['FUNCTIONDEF'][0], 1)
+        self.assertEqual(profiler.handlers['NAME'][0], 2)
+        for calls, seconds in profiler.handlers.values():
+            self.assertTrue(seconds >= 0)
+
+    def test_passThrough(self):
+        """
+        The nodes whose children are handled without calling their handler
+        are counted too.
+        """
+        profiler = self.check('a + b + c')
+        self.assertEqual(profiler.handlers['EXPR'][0], 1)
+        self.assertEqual(profiler.handlers['BINOP'][0], 2)
+        self.assertEqual(profiler.handlers['NAME'][0], 3)
+
+    def test_phases(self):
+        """
+        The phases of the check are timed.
+        """
+        profiler = self.check('''
+        def f():
+            pass
+        ''')
+        self.assertEqual(profiler.phases['first pass'][0], 1)
+        self.assertEqual(profiler.phases['deferred functions'][0], 2)
+        self.assertEqual(profiler.phases['dead scopes'][0], 1)
+
+    def test_disabled(self):
+        """
+        Handlers are not wrapped when no profiler is given.
+        """
+        w = checker.Checker(compile('', "<test>", "exec", PyCF_ONLY_AST))
+        self.assertEqual(w.getNodeHandler(ast.Name).__name__, 'NAME')
+
+    def test_merge(self):
+        """
+        L{Profiler.merge} adds the measures of another profiler.
+        """
+        one = self.check('import os')
+        two = self.check('import os, sys')
+        one.merge(two.asDict())
+        self.assertEqual(one.handlers['IMPORT'][0], 2)
+        self.assertEqual(one.phases['first pass'][0], 2)
+
+    def test_formatTable(self):
+        """
+        L{Profiler.formatTable} lists the handlers and the phases.
+        """
+        table = self.check('import os').formatTable()
+        self.assertIn('IMPORT', table)
+        self.assertIn('first pass', table)
@@ -320,6 +320,16 @@ class Test(TestCase):
         def b(): fu; bar
         ''')
 
+    def test_definedByGlobalRepeatedUses(self):
+        """
+        "global" suppresses every earlier report of the name, and only those.
+        """
+        self.flakes('''
+        def a(): fu; bar; fu
+        def b(): bar; global fu
+        def c(): global fu, baz
+        ''', m.UndefinedName, m.UndefinedName)
+
     def test_globalInGlobalScope(self):
         """
         A global statement in the global scope is ignored.
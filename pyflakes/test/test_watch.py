@@ -0,0 +1,144 @@
+"""
+Tests for L{pyflakes.watch}.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from pyflakes import watch
+from pyflakes.messages import UnusedImport
+from pyflakes.watch import Watcher
+from pyflakes.test.harness import TestCase
+from pyflakes.test.test_api import LoggingReporter, Node
+
+if sys.version_info < (3,):
+    from cStringIO import StringIO
+else:
+    from io import StringIO
+
+
+class TestWatcher(TestCase):
+    """
+    Tests for L{Watcher}.
+    """
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log = []
+        self.summary = StringIO()
+        self.watcher = Watcher([self.tempdir], LoggingReporter(self.log),
+                               self.summary)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def writeFile(self, name, content):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as fd:
+            fd.write(content.encode('ascii'))
+        return path
+
+    def flake(self, path, lineno, name):
+        return ('flake', str(UnusedImport(path, Node(lineno), name)))
+
+    def test_start(self):
+        """
+        All the files are checked first.
+        """
+        apath = self.writeFile('a.py', 'import fu\n')
+        bpath = self.writeFile('b.py', '')
+        self.watcher.start()
+        self.assertEqual(self.log, [self.flake(apath, 1, 'fu')])
+        self.assertEqual(self.watcher.warnings, {apath: 1, bpath: 0})
+        self.assertEqual(self.summary.getvalue(),
+                         '1 warning(s) in 1 of 2 file(s)\n')
+
+    def test_unchanged(self):
+        """
+        Nothing is checked when no file changed.
+        """
+        self.writeFile('a.py', 'import fu\n')
+        self.watcher.start()
+        del self.log[:]
+        self.assertEqual(self.watcher.step(), [])
+        self.assertEqual(self.log, [])
+
+    def test_modified(self):
+        """
+        Only the modified files are checked again.
+        """
+        apath = self.writeFile('a.py', 'import fu\n')
+        self.writeFile('b.py', 'import bar\n')
+        self.watcher.start()
+        del self.log[:]
+        self.writeFile('a.py', 'import fu\nimport baz\nfu\n')
+        self.assertEqual(self.watcher.step(), [apath])
+        self.assertEqual(self.log, [self.flake(apath, 2, 'baz')])
+        self.assertEqual(self.summary.getvalue().splitlines()[-1],
+                         '2 warning(s) in 2 of 2 file(s)')
+
+    def test_modifiedAgain(self):
+        """
+        A file modified again is checked reusing its unchanged definitions.
+        """
+        apath = self.writeFile('a.py', 'import fu\ndef f():\n    fu\n')
+        self.watcher.start()
+        self.writeFile('a.py', 'import fu\ndef f():\n    fu\ndef g(): g\n')
+        self.watcher.step()
+        self.writeFile('a.py', 'import fu\ndef f():\n    fu\ndef g(): fu\n')
+        self.assertEqual(self.watcher.step(), [apath])
+        self.assertEqual(self.watcher._checkers[apath].reusedDefinitions, 1)
+        self.assertEqual(self.watcher.warnings, {apath: 0})
+
+    def test_checkerFailure(self):
+        """
+        A file which the checker fails on is reported as an error, and the
+        other files are still checked.
+        """
+        apath = self.writeFile('a.py', 'import fu\n')
+        bpath = self.writeFile('b.py', 'import bar\n')
+        self.watcher.start()
+        del self.log[:]
+
+        def fail(tree, filename, previous=None):
+            if filename == apath:
+                raise RuntimeError('maximum recursion depth exceeded')
+            return IncrementalChecker(tree, filename, previous=previous)
+        IncrementalChecker = watch.IncrementalChecker
+        watch.IncrementalChecker = fail
+        self.addCleanup(setattr, watch, 'IncrementalChecker',
+                        IncrementalChecker)
+        self.writeFile('a.py', 'import fu\nimport baz\n')
+        self.writeFile('b.py', 'import bar\nimport baz\n')
+        self.assertEqual(sorted(self.watcher.step()), sorted([apath, bpath]))
+        self.assertIn(('unexpectedError', apath,
+                       'problem checking source: '
+                       'maximum recursion depth exceeded'), self.log)
+        self.assertEqual(self.watcher.warnings, {apath: 1, bpath: 2})
+
+    def test_addedAndRemoved(self):
+        """
+        Added files are checked and removed files are forgotten.
+        """
+        apath = self.writeFile('a.py', 'import fu\n')
+        self.watcher.start()
+        os.remove(apath)
+        bpath = self.writeFile('b.py', 'import bar\n')
+        self.assertEqual(self.watcher.step(), [bpath])
+        self.assertEqual(self.watcher.warnings, {bpath: 1})
+
+    def test_walkOptions(self):
+        """
+        The files are found with the options given for
+        L{pyflakes.api.iterSourceCode}.
+        """
+        apath = self.writeFile('a.py', 'import fu\n')
+        self.writeFile('test_a.py', 'import fu\n')
+        self.writeFile('script', '#!/usr/bin/env python\nimport fu\n')
+        walkOptions = {'exclude': ['test_*'], 'sniffShebang': False}
+        watcher = Watcher([self.tempdir], LoggingReporter(self.log),
+                          self.summary, walkOptions=walkOptions)
+        watcher.start()
+        self.assertEqual(watcher.warnings, {apath: 1})
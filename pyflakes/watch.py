@@ -0,0 +1,149 @@
+"""
+Check Python files again each time they change.
+"""
+from __future__ import with_statement
+
+import _ast
+import os
+import sys
+import time
+
+from pyflakes import api
+from pyflakes.incremental import IncrementalChecker
+
+__all__ = ['Watcher']
+
+
+class Watcher(object):
+    """
+    Watch the Python files in some paths, and check the files which are added
+    or modified.
+
+    Changes are found by polling the modification time and size of the files.
+    Files which did not change are not read again.  A modified file is checked
+    with an L{IncrementalChecker}, which is kept to reuse the results for the
+    unchanged definitions of the file when it is modified again.
+
+    @ivar warnings: The number of warnings of each file, by path.
+    """
+
+    def __init__(self, paths, reporter, summaryStream=None, walkOptions=None):
+        """
+        @param paths: A list of paths to Python source files and directories
+            containing Python source files.
+        @param reporter: A L{Reporter} where the warnings and errors of each
+            checked file are reported to.
+        @param summaryStream: A file-like object where a summary of the
+            warnings of all the files is written after each check.
+            C{sys.stderr} is used by default.
+        @param walkOptions: The keyword arguments of L{api.iterSourceCode}
+            used to find the files in C{paths}, like C{exclude}.
+        """
+        self.paths = paths
+        self.walkOptions = walkOptions or {}
+        self.reporter = reporter
+        self.summaryStream = summaryStream or sys.stderr
+        self.warnings = {}
+        self._stats = {}
+        self._checkers = {}
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def poll(self):
+        """
+        Look for files which were added, modified or removed.
+
+        @return: The paths of the files which were added or modified.
+        """
+        changed = []
+        seen = set()
+        for path in api.iterSourceCode(self.paths, **self.walkOptions):
+            seen.add(path)
+            stat = self._stat(path)
+            if self._stats.get(path) != stat:
+                self._stats[path] = stat
+                changed.append(path)
+        for path in set(self._stats).difference(seen):
+            del self._stats[path]
+            self.warnings.pop(path, None)
+            self._checkers.pop(path, None)
+        return changed
+
+    def checkFile(self, path):
+        """
+        Check C{path}, reusing the result of its previous check.
+        """
+        try:
+            with open(path, 'rb') as f:
+                codestr = f.read()
+            tree = compile(codestr, path, "exec", _ast.PyCF_ONLY_AST)
+        except Exception:
+            # Let checkPath report the problem, in the same way.
+            self._checkers.pop(path, None)
+            self.warnings[path] = api.checkPath(path, self.reporter)
+            return
+        try:
+            w = IncrementalChecker(tree, path,
+                                   previous=self._checkers.get(path))
+        except Exception:
+            # Keep watching the other files.
+            self._checkers.pop(path, None)
+            self.reporter.unexpectedError(
+                path, 'problem checking source: %s' % (sys.exc_info()[1],))
+            self.warnings[path] = 1
+            return
+        # Only the results of the check are kept for the next one.
+        result = w.release()
+        self._checkers[path] = w
+        result.messages.sort(key=lambda m: m.lineno)
+        for warning in result.messages:
+            self.reporter.flake(warning)
+        self.warnings[path] = len(result.messages)
+
+    def start(self):
+        """
+        Check all the files, and write a summary.
+        """
+        for path in self.poll():
+            self.warnings[path] = api.checkPath(path, self.reporter)
+        self.writeSummary()
+
+    def step(self):
+        """
+        Check the files which changed since the previous step, and write a
+        summary if any file was added, modified or removed.
+
+        @return: The paths of the checked files.
+        """
+        known = len(self.warnings)
+        changed = self.poll()
+        for path in changed:
+            self.checkFile(path)
+        if changed or len(self.warnings) != known:
+            self.writeSummary()
+        return changed
+
+    def writeSummary(self):
+        if hasattr(self.reporter, 'flush'):
+            self.reporter.flush()
+        total = sum(self.warnings.values())
+        flaky = len([count for count in self.warnings.values() if count])
+        self.summaryStream.write(
+            '%d warning(s) in %d of %d file(s)\n' %
+            (total, flaky, len(self.warnings)))
+        self.summaryStream.flush()
+
+    def run(self, interval=1.0):
+        """
+        Check all the files, then check them again as they change, until
+        interrupted.
+        """
+        self.start()
+        while True:
+            time.sleep(interval)
+            self.step()
@@ -14,7 +14,10 @@ else:
     extra = {
         'test_suite': 'pyflakes.test',
         'entry_points': {
-            'console_scripts': ['pyflakes = pyflakes.api:main'],
+            'console_scripts': [
+                'pyflakes = pyflakes.api:main',
+                'pyflakes-client = pyflakes.daemon:main',
+            ],
         },
     }
 
@@ -43,7 +46,8 @@ setup(
     author="A lot of people",
     author_email="code-quality@python.org",
     url="https://github.com/PyCQA/pyflakes",
-    packages=["pyflakes", "pyflakes.scripts", "pyflakes.test"],
+    packages=["pyflakes", "pyflakes.bench", "pyflakes.scripts",
+              "pyflakes.test"],
     python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*',
     classifiers=[
         "Development Status :: 6 - Mature",